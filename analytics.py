@@ -0,0 +1,126 @@
+"""Reports analytics computed with NumPy.
+
+app.py loads two sets of columns once per data version: the daily rollup rows (day,
+category, total) and the matching expenses' (id, amount, category), with amounts in
+integer cents. Everything here is derived from those arrays in a few vectorized passes:
+no per-metric queries and no Python loops over rows. Results are plain lists and dicts
+with amounts in dollars, so they can be cached and returned as JSON. recurring_due works
+the same way on the recurring templates' columns for the reports page's projection.
+
+NumPy is optional: app.py imports this module only when building the analytics.
+"""
+import numpy as np
+
+PERCENTILES = (50, 75, 90, 95, 99)
+ROLLING_WINDOWS = (30, 90)
+
+
+def month_label(month_code):
+    """'YYYY-MM' for a count of months since 1970-01"""
+    return str(np.datetime64(int(month_code), 'M'))
+
+
+def dollars(cents):
+    """Cent values (possibly fractional, e.g. averages) as dollars rounded to the cent"""
+    return [round(float(value) / 100, 2) for value in cents]
+
+
+def ledger_analytics(days, day_categories, day_totals, ids, amounts, categories, category_names,
+                     as_of, top_n=10):
+    """Pivot, trends and distribution for one ledger selection.
+
+    days/day_categories/day_totals are the rollup columns (days as datetime64[D]), ids/
+    amounts/categories the individual expenses (day_totals and amounts in cents),
+    category_names maps category id -> name and as_of (a date) ends the rolling windows.
+    """
+    result = {
+        'count': int(amounts.size),
+        'total': round(float(day_totals.sum()) / 100, 2),
+        'months': [],
+        'categories': [],
+        'pivot': [],
+        'month_totals': [],
+        'month_deltas': [],
+        'month_delta_pcts': [],
+        'rolling': {},
+        'percentiles': {},
+        'category_percentiles': {},
+        'top_expense_ids': []
+    }
+    if not days.size:
+        return result
+
+    # Category x month pivot in one bincount over the rollup rows
+    month_codes = days.astype('datetime64[M]').astype(np.int64)
+    first_month = month_codes.min()
+    last_month = max(month_codes.max(), np.datetime64(as_of, 'M').astype(np.int64))
+    month_count = int(last_month - first_month + 1)
+    category_ids, category_codes = np.unique(day_categories, return_inverse=True)
+    pivot = np.bincount(
+        category_codes * month_count + (month_codes - first_month),
+        weights=day_totals, minlength=len(category_ids) * month_count
+    ).reshape(len(category_ids), month_count)
+
+    # Categories ordered by total spend, largest first
+    order = np.argsort(-pivot.sum(axis=1), kind='stable')
+    result['months'] = [month_label(code) for code in range(first_month, last_month + 1)]
+    result['categories'] = [category_names.get(int(category_ids[i]), 'Unknown') for i in order]
+    result['pivot'] = [dollars(pivot[i]) for i in order]
+
+    # Month-over-month change
+    month_totals = pivot.sum(axis=0)
+    deltas = np.diff(month_totals, prepend=np.nan)
+    previous = np.concatenate(([np.nan], month_totals[:-1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta_pcts = np.where(previous > 0, deltas / previous * 100, np.nan)
+    result['month_totals'] = dollars(month_totals)
+    result['month_deltas'] = [None if np.isnan(value) else round(float(value) / 100, 2) for value in deltas]
+    result['month_delta_pcts'] = [None if np.isnan(value) else round(float(value), 1) for value in delta_pcts]
+
+    # Trailing average daily spend, from prefix sums of the daily totals
+    day_numbers = days.astype(np.int64)
+    first_day = day_numbers.min()
+    last_day = max(day_numbers.max(), np.datetime64(as_of, 'D').astype(np.int64))
+    daily = np.bincount(day_numbers - first_day, weights=day_totals, minlength=int(last_day - first_day + 1))
+    prefix = np.concatenate(([0.0], np.cumsum(daily)))
+    # Each month's last day (today for the current month), as an index into daily
+    month_ends = (np.arange(first_month + 1, last_month + 2).astype('datetime64[M]')
+                  .astype('datetime64[D]').astype(np.int64) - 1 - first_day)
+    month_ends = np.minimum(month_ends, daily.size - 1)
+    for window in ROLLING_WINDOWS:
+        window_sums = prefix[month_ends + 1] - prefix[np.maximum(month_ends + 1 - window, 0)]
+        result['rolling'][str(window)] = dollars(window_sums / window)
+
+    # Distribution of individual expenses: sort once by (category, amount), then slice
+    if amounts.size:
+        result['percentiles'] = dict(zip(map(str, PERCENTILES), dollars(np.percentile(amounts, PERCENTILES))))
+        order = np.lexsort((amounts, categories))
+        sorted_amounts = amounts[order]
+        sorted_categories = categories[order]
+        boundaries = np.flatnonzero(np.diff(sorted_categories)) + 1
+        for chunk, category_id in zip(np.split(sorted_amounts, boundaries),
+                                      sorted_categories[np.concatenate(([0], boundaries))]):
+            name = category_names.get(int(category_id), 'Unknown')
+            result['category_percentiles'][name] = dict(
+                zip(map(str, PERCENTILES), dollars(np.percentile(chunk, PERCENTILES))))
+
+        n = min(top_n, amounts.size)
+        top = np.argpartition(-amounts, n - 1)[:n]
+        top = top[np.argsort(-amounts[top], kind='stable')]
+        result['top_expense_ids'] = [int(expense_id) for expense_id in ids[top]]
+
+    return result
+
+
+def recurring_due(amounts, through_months, first_month, months):
+    """Cents of monthly expenses due in each of months months from first_month on.
+
+    amounts are the recurring templates' amounts in cents and through_months the month each
+    has been materialized through, with months counted as year * 12 + month. A template is
+    due once every month after its through month; months missed before first_month are
+    caught up into the first one.
+    """
+    first_due = through_months.astype(np.int64) + 1 - first_month
+    due = np.cumsum(np.bincount(np.clip(first_due, 1, months), weights=amounts, minlength=months + 1)[:months])
+    due[0] = (amounts * np.maximum(1 - first_due, 0)).sum()
+    return [int(round(value)) for value in due]
@@ -1,52 +1,792 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response
+from flask import (Flask, Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response,
+                   stream_with_context, g, session, send_file, current_app)
+from flask.cli import with_appcontext
+from werkzeug.local import LocalProxy
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, date
-from sqlalchemy import func, extract
+from sqlalchemy.orm import joinedload
+from datetime import datetime, date, timedelta, timezone
+from sqlalchemy import (bindparam, func, extract, and_, case, true, text, event, exc, tuple_, table, column,
+                        literal_column, MetaData)
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import partial, wraps
+from urllib.parse import urlencode
+import base64
+import calendar
+import click
+import csv
+import hashlib
+import io
+import json
 import os
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from io import BytesIO
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///expenses.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
-
-class Category(db.Model):
+import re
+import sqlite3
+import time
+from xml.sax.saxutils import escape
+from cache import make_cache
+from config import Config
+from instrumentation import Instrumentation
+from money import MAX_CENTS, cents_to_float, format_cents, from_cents, to_cents
+from pdf_jobs import PdfJobQueue, QueueFullError
+from serialization import RowSerializer, dumps, parse_fields
+from tenancy import (DEFAULT_TENANT_SLUG, TenantEngines, TenantScoped, TenantSession, current_tenant_id,
+                     default_tenant_id, valid_slug)
+
+db = SQLAlchemy(session_options={'class_': TenantSession})
+bp = Blueprint('main', __name__)
+
+# Per-app services, created in create_app()
+response_cache = LocalProxy(lambda: current_app.extensions['response_cache'])
+pdf_jobs = LocalProxy(lambda: current_app.extensions['pdf_jobs'])
+
+def create_app(config=None):
+    """Application factory; config is a mapping of overrides applied on top of Config"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    if not app.config['PDF_JOB_DIR']:
+        app.config['PDF_JOB_DIR'] = os.path.join(app.instance_path, 'pdf_jobs')
+    if not app.config['PROFILE_DIR']:
+        app.config['PROFILE_DIR'] = os.path.join(app.instance_path, 'profiles')
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    
+    db.init_app(app)
+    with app.app_context():
+        if app.config['SQLITE_TUNE']:
+            event.listen(db.engine, 'connect', partial(tune_sqlite_connection, app.config))
+        if app.config['INSTRUMENTATION']:
+            Instrumentation(
+                profile_sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+                profile_slow_ms=app.config['PROFILE_SLOW_MS'],
+                profile_dir=app.config['PROFILE_DIR']
+            ).init_app(app, db.engine)
+    if app.config['TENANT_DATABASE_DIR']:
+        app.extensions['tenant_engines'] = TenantEngines(
+            app.config['TENANT_DATABASE_DIR'],
+            engine_options=sqlite_file_engine_options(app.config),
+            on_create=partial(prepare_tenant_engine, app)
+        )
+    # Tenant slug -> TenantRef, filled as requests name them
+    app.extensions['tenants'] = {}
+    
+    app.extensions['response_cache'] = make_cache(
+        app.config['CACHE_BACKEND'],
+        ttl=app.config['CACHE_TTL'],
+        max_entries=app.config['CACHE_MAX_ENTRIES'],
+        path=app.config['CACHE_PATH']
+    )
+    app.extensions['pdf_jobs'] = PdfJobQueue(
+        app.config['PDF_JOB_DIR'],
+        max_workers=app.config['PDF_JOB_WORKERS'],
+        max_pending=app.config['PDF_JOB_MAX_PENDING']
+    )
+    
+    app.register_blueprint(bp)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(create_tenant_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(materialize_recurring_command)
+    app.cli.add_command(reconcile_budgets_command)
+    return app
+
+def engine_options(config):
+    """SQLAlchemy engine options for the configured database"""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        if ':memory:' in uri or uri in ('sqlite://', 'sqlite:///'):
+            return {}
+        return sqlite_file_engine_options(config)
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True
+    }
+
+def sqlite_file_engine_options(config):
+    # Connections are cheap to open but keeping them lets the page cache and mmap pay off
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT'], 'check_same_thread': False}
+    }
+
+def prepare_tenant_engine(app, engine):
+    """Give a per-tenant database the same connection tuning and instrumentation as the main one"""
+    if app.config['SQLITE_TUNE']:
+        event.listen(engine, 'connect', partial(tune_sqlite_connection, app.config))
+    instrumentation = app.extensions.get('instrumentation')
+    if instrumentation is not None:
+        instrumentation.watch_engine(engine)
+
+def tune_sqlite_connection(config, dbapi_connection, connection_record):
+    """WAL lets readers proceed while a write is in progress; NORMAL sync is safe under WAL"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f"PRAGMA cache_size=-{config['SQLITE_CACHE_SIZE_KB']}")
+    cursor.execute(f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}")
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+# Full-ledger PDF: rows fetched per DB round trip
+LEDGER_FETCH_SIZE = 1000
+
+# Bulk import: rows inserted per transaction, and how many row errors are reported back
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 100
+
+# Rows fetched per DB round trip by /api/expenses/export
+EXPORT_FETCH_SIZE = 5000
+
+# /api/expenses paging: default/maximum page size and rows fetched per DB round trip when streaming
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_STREAM_CHUNK = 500
+
+# Largest ?per_page accepted by the expenses page
+EXPENSES_MAX_PAGE_SIZE = 100
+
+# Rows fetched per DB round trip when loading the ledger into NumPy for the reports analytics
+ANALYTICS_FETCH_SIZE = 50000
+
+# Recurring expenses: monthly templates read per batch, and months covered by the reports projection
+RECURRING_BATCH_SIZE = 1000
+PROJECTION_MONTHS = 6
+
+class Tenant(db.Model):
+    """A separate ledger (a household or user); see tenancy.py"""
+    # Registry table: stays in the main database when tenants have their own files
+    __table_args__ = {'info': {'registry': True}}
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(63), unique=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+@dataclass(frozen=True)
+class TenantRef:
+    """The id and slug of a tenant, safe to keep across sessions and hand to background jobs"""
+    id: int
+    slug: str
+
+class Category(TenantScoped, db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(50), unique=True, nullable=False)
+    name = db.Column(db.String(50), nullable=False)
     description = db.Column(db.String(200))
+    # Spending limit per calendar month, in cents; None means no budget
+    monthly_budget_cents = db.Column(db.BigInteger)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expenses = db.relationship('Expense', backref='category', lazy=True)
 
-class Expense(db.Model):
+    # Names are unique within a tenant
+    __table_args__ = (
+        db.Index('ix_category_tenant_name', 'tenant_id', 'name', unique=True),
+    )
+
+class Expense(TenantScoped, db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    amount = db.Column(db.Float, nullable=False)
+    # Integer cents (see money.py), so sums in SQL and in the rollups are exact
+    amount_cents = db.Column(db.BigInteger, nullable=False)
     description = db.Column(db.String(200), nullable=False)
     date = db.Column(db.Date, nullable=False, default=date.today)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
     is_monthly = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # The monthly expense a series is generated from (see materialize_recurring). Only set
+    # from the add/edit forms: imported and generated monthly rows never start a series.
+    is_recurring_template = db.Column(db.Boolean, default=False, nullable=False)
+    # On templates: the last occurrence materialized or found already entered. Series resume
+    # after it, so an occurrence deleted to skip a month is not generated again.
+    recurring_through = db.Column(db.Date)
+    # Set on occurrences of a series, generated or re-entered by hand. Not a foreign key:
+    # deleting the original stops the series but keeps its past occurrences.
+    recurring_source_id = db.Column(db.Integer)
+
+    # Every query is scoped to a tenant, so the listing indexes lead on tenant_id: listings
+    # seek on (tenant_id, date, id); category filters narrow on (tenant_id, category_id) then
+    # range-scan date. Recurring templates are found through ix_expense_recurring_template,
+    # and the unique occurrence index keeps a series from holding a date twice.
+    __table_args__ = (
+        db.Index('ix_expense_tenant_date_id', 'tenant_id', 'date', 'id'),
+        db.Index('ix_expense_tenant_category_date', 'tenant_id', 'category_id', 'date'),
+        db.Index('ix_expense_recurring_template', 'is_recurring_template', 'id'),
+        db.Index('ix_expense_recurring_occurrence', 'recurring_source_id', 'date', unique=True),
+    )
+
+    @property
+    def amount(self):
+        """The amount as an exact Decimal"""
+        return from_cents(self.amount_cents)
 
     def to_dict(self):
         return {
             'id': self.id,
-            'amount': self.amount,
+            'amount': cents_to_float(self.amount_cents),
             'description': self.description,
-            'date': self.date.strftime('%Y-%m-%d'),
+            'date': self.date.isoformat(),
             'category': self.category.name if self.category else None,
             'is_monthly': self.is_monthly,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            'created_at': self.created_at.isoformat(sep=' ', timespec='seconds')
+        }
+
+class ExpenseRollup(TenantScoped, db.Model):
+    """Per-day, per-category totals kept in step with expense writes (see adjust_rollup)"""
+    day = db.Column(db.Date, primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), primary_key=True)
+    total_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_expense_rollup_tenant_day', 'tenant_id', 'day'),
+    )
+
+class MonthlySpend(TenantScoped, db.Model):
+    """Running per-month, per-category totals for budget checks, kept in step by adjust_rollup"""
+    # First day of the month
+    month = db.Column(db.Date, primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), primary_key=True)
+    spent_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_monthly_spend_tenant_month', 'tenant_id', 'month'),
+    )
+
+class DataVersion(db.Model):
+    """Per-tenant counter (id = tenant id) bumped by every write; cache keys embed it so stale entries are never read"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Time of the last write, used for Last-Modified
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def expense_listing_query():
+    """Expense query with the category joined in, so listings don't issue a SELECT per row"""
+    return Expense.query.options(joinedload(Expense.category))
+
+# Fields the expense API returns (?fields= picks some), in their default order: the column
+# and the formatter for its values (see serialization.py); the same output as Expense.to_dict
+EXPENSE_API_FIELDS = {
+    'id': (Expense.id, None),
+    'amount': (Expense.amount_cents, cents_to_float),
+    'description': (Expense.description, None),
+    'date': (Expense.date, date.isoformat),
+    'category': (Category.name, None),
+    'is_monthly': (Expense.is_monthly, None),
+    'created_at': (Expense.created_at, partial(datetime.isoformat, sep=' ', timespec='seconds'))
+}
+
+def expense_api_rows(fields):
+    """(query, serializer) for an API listing of fields, as row tuples rather than ORM objects.
+
+    Rows start with cursor_id and cursor_date (for keyset cursors) whatever the fields; the
+    category is only joined when asked for.
+    """
+    query = db.session.query(
+        Expense.id.label('cursor_id'), Expense.date.label('cursor_date'),
+        *[EXPENSE_API_FIELDS[field][0] for field in fields]
+    )
+    if 'category' in fields:
+        query = query.outerjoin(Category, Expense.category_id == Category.id)
+    serializer = RowSerializer(fields, {field: EXPENSE_API_FIELDS[field][1] for field in fields}, offset=2)
+    return query, serializer
+
+def keyset_page(query, limit, after=None, before=None):
+    """One page of query in (date desc, id desc) order, seeking from a (date, id) cursor.
+
+    after continues with older rows than the cursor, before goes back to newer ones.
+    Returns the rows and whether more exist beyond the page in the direction travelled.
+    The row-value comparison lets the (date, id) index seek straight to the cursor.
+    """
+    key = tuple_(Expense.date, Expense.id)
+    if before:
+        rows = query.filter(key > tuple_(*before)).order_by(
+            Expense.date, Expense.id).limit(limit + 1).all()
+        return rows[:limit][::-1], len(rows) > limit
+    if after:
+        query = query.filter(key < tuple_(*after))
+    rows = query.order_by(Expense.date.desc(), Expense.id.desc()).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def find_tenant(slug):
+    """TenantRef for slug, or None; looked up once per app (tenants are never removed)"""
+    tenants = current_app.extensions['tenants']
+    tenant = tenants.get(slug)
+    if tenant is None:
+        row = db.session.query(Tenant.id, Tenant.slug).filter(Tenant.slug == slug).first()
+        if row is None:
+            return None
+        tenant = tenants[slug] = TenantRef(row.id, row.slug)
+    return tenant
+
+def use_tenant(tenant):
+    """Scope the rest of this app context to tenant: its rows, data version and, with per-tenant files, its database"""
+    engines = current_app.extensions.get('tenant_engines')
+    g.tenant = TenantRef(tenant.id, tenant.slug)
+    g.tenant_id = tenant.id
+    g.tenant_engine = engines.get(tenant.slug) if engines else None
+    g.pop('data_state', None)
+
+@contextmanager
+def tenant_context(tenant):
+    """Run a block bound to tenant, then restore the previous binding (for passes over several tenants)"""
+    saved = {key: g.get(key) for key in ('tenant', 'tenant_id', 'tenant_engine')}
+    # Objects loaded for one tenant must not be found in the identity map while serving another
+    db.session.close()
+    use_tenant(tenant)
+    try:
+        yield
+    finally:
+        db.session.close()
+        for key, value in saved.items():
+            if value is None:
+                g.pop(key, None)
+            else:
+                setattr(g, key, value)
+        g.pop('data_state', None)
+
+def each_tenant_database():
+    """Bindings for a maintenance pass over every ledger.
+
+    With per-tenant files, yields each tenant while bound to it (and its database);
+    otherwise yields None once, unbound, so statements cover every tenant together.
+    """
+    if not current_app.config['TENANT_DATABASE_DIR']:
+        yield None
+        return
+    for tenant in db.session.query(Tenant.id, Tenant.slug).order_by(Tenant.id).all():
+        tenant = TenantRef(tenant.id, tenant.slug)
+        with tenant_context(tenant):
+            yield tenant
+
+def tenant_clause(model):
+    """model.tenant_id = the bound tenant (no condition when unbound).
+
+    For statements scope_to_tenant does not reach: INSERT ... SELECT and raw cursor reads.
+    """
+    tenant_id = current_tenant_id()
+    return true() if tenant_id is None else model.tenant_id == tenant_id
+
+def upsert_statement(table):
+    """INSERT for table that supports on_conflict_do_update (SQLite and PostgreSQL)"""
+    if db.session.get_bind(clause=table).dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+def add_to_counter(model, key, increments, tenant_id):
+    """Add increments to model's counter row for key, creating it if missing; drop it once its count reaches 0.
+
+    A single INSERT ... ON CONFLICT DO UPDATE, so concurrent writers never overwrite each
+    other's totals (as a read then a write would) or race to insert the same row.
+    """
+    table = model.__table__
+    statement = upsert_statement(table).values(tenant_id=tenant_id, **key, **increments)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(key),
+        set_={name: table.c[name] + statement.excluded[name] for name in increments}
+    )
+    db.session.execute(statement)
+    db.session.execute(table.delete().where(
+        *[table.c[name] == value for name, value in key.items()], table.c['count'] <= 0))
+
+def adjust_rollup(day, category_id, amount_cents, count, tenant_id=None):
+    """Add (or with negative values, remove) expenses to the rollup rows for day/category.
+
+    Updates both the daily rollup and the monthly spend counter, inside the caller's
+    transaction so they commit together with the expense. New rows belong to tenant_id
+    (default: the bound tenant).
+    """
+    tenant_id = tenant_id or default_tenant_id()
+    add_to_counter(ExpenseRollup, {'day': day, 'category_id': category_id},
+                   {'total_cents': amount_cents, 'count': count}, tenant_id)
+    add_to_counter(MonthlySpend, {'month': day.replace(day=1), 'category_id': category_id},
+                   {'spent_cents': amount_cents, 'count': count}, tenant_id)
+
+def rebuild_rollups():
+    """Recompute the bound tenant's rollup rows (every tenant's when unbound) from the expense table"""
+    db.session.query(ExpenseRollup).delete()
+    db.session.execute(ExpenseRollup.__table__.insert().from_select(
+        ['tenant_id', 'day', 'category_id', 'total_cents', 'count'],
+        db.select(
+            Expense.tenant_id, Expense.date, Expense.category_id,
+            func.sum(Expense.amount_cents), func.count(Expense.id)
+        ).where(tenant_clause(Expense)).group_by(Expense.tenant_id, Expense.date, Expense.category_id)
+    ))
+    bump_data_version()
+    db.session.commit()
+    reconcile_monthly_spend()
+
+def reconcile_monthly_spend():
+    """Recompute the monthly spend counters from the ledger and correct any that drifted.
+
+    Returns (month, category_id, counter_cents, ledger_cents) for every corrected counter.
+    """
+    year = extract('year', Expense.date)
+    month = extract('month', Expense.date)
+    ledger = {
+        (date(int(y), int(m), 1), category_id): (int(total), count, tenant_id)
+        for tenant_id, y, m, category_id, total, count in db.session.query(
+            Expense.tenant_id, year, month, Expense.category_id,
+            func.sum(Expense.amount_cents), func.count(Expense.id)
+        ).group_by(Expense.tenant_id, year, month, Expense.category_id)
+    }
+    counters = {(spend.month, spend.category_id): spend for spend in MonthlySpend.query}
+    
+    corrected = []
+    for key in ledger.keys() | counters.keys():
+        total, count, tenant_id = ledger.get(key, (0, 0, None))
+        spend = counters.get(key)
+        if spend is not None and (spend.spent_cents, spend.count) == (total, count):
+            continue
+        corrected.append((key[0], key[1], spend.spent_cents if spend else 0, total))
+        if spend is None:
+            db.session.add(MonthlySpend(
+                tenant_id=tenant_id, month=key[0], category_id=key[1], spent_cents=total, count=count))
+        elif count == 0:
+            db.session.delete(spend)
+        else:
+            spend.spent_cents, spend.count = total, count
+    if corrected:
+        bump_data_version()
+    db.session.commit()
+    return sorted(corrected)
+
+def current_data_state():
+    """The tenant's (version, changed_at) as of this request (read once per request)"""
+    if 'data_state' not in g:
+        row = db.session.query(DataVersion.version, DataVersion.changed_at).filter(
+            DataVersion.id == default_tenant_id()).first()
+        g.data_state = (row.version, row.changed_at) if row else (0, None)
+    return g.data_state
+
+def current_data_version():
+    return current_data_state()[0]
+
+def bump_data_version():
+    """Invalidate cached results; call before committing any change to expenses or categories.
+
+    Bumps the bound tenant's version, or every tenant's when unbound.
+    """
+    statement = db.update(DataVersion).values(
+        version=DataVersion.version + 1,
+        changed_at=datetime.utcnow()
+    )
+    tenant_id = current_tenant_id()
+    if tenant_id is not None:
+        statement = statement.where(DataVersion.id == tenant_id)
+    db.session.execute(statement)
+    g.pop('data_state', None)
+
+def conditional_headers(*parts, as_of=None):
+    """Strong ETag and Last-Modified for a response derived from the current data version.
+
+    Returns (etag, last_modified, not_modified) where not_modified is True when the
+    client's If-None-Match / If-Modified-Since shows it already holds this version,
+    so the caller can answer 304 without running its queries. Pass as_of (today) for
+    responses that also depend on the date, such as month-to-date totals.
+    """
+    version, changed_at = current_data_state()
+    last_modified = changed_at.replace(tzinfo=timezone.utc, microsecond=0) if changed_at else None
+    if as_of is not None:
+        # A new day changes the response as much as a write does
+        parts += (as_of.isoformat(),)
+        day_start = datetime.combine(as_of, datetime.min.time(), tzinfo=timezone.utc)
+        last_modified = max(last_modified, day_start) if last_modified else day_start
+    etag = hashlib.sha1(':'.join([str(default_tenant_id()), str(version), *parts]).encode()).hexdigest()
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(request.if_modified_since and last_modified
+                            and last_modified <= request.if_modified_since)
+    return etag, last_modified, not_modified
+
+def not_modified_response(etag, last_modified):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+def versioned_cache_key(*parts):
+    # Month-to-date totals and rolling windows move with the date, so keys also roll over daily
+    return ':'.join([f't{default_tenant_id()}', f'v{current_data_version()}', date.today().isoformat(), *parts])
+
+def normalized_args(args):
+    """Query string with parameters sorted, so equivalent URLs share a cache entry"""
+    return urlencode(sorted(args.items(multi=True)))
+
+def cached_view(view):
+    """Cache a view's rendered body per URL and data version.
+
+    Requests with pending flash messages skip the cache, since the messages are part of the page.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if '_flashes' in session:
+            return view(*args, **kwargs)
+        key = versioned_cache_key('view', request.path, normalized_args(request.args))
+        return response_cache.get_or_set(key, lambda: view(*args, **kwargs))
+    return wrapper
+
+def timed_stage(stage):
+    """Report the wrapped call's duration as stage when instrumentation is enabled"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            instrumentation = current_app.extensions.get('instrumentation')
+            if instrumentation is None:
+                return f(*args, **kwargs)
+            with instrumentation.timed(stage):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def month_bounds(day):
+    """First day of day's month and first day of the following month"""
+    start = day.replace(day=1)
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+@dataclass(frozen=True)
+class ExpenseFilter:
+    """Normalized category/date selection shared by the dashboard, its PDF and the API.
+
+    Instances are immutable and hashable, so equal selections made through different
+    routes (or with categories in a different order) can share cached results.
+    """
+    category_ids: tuple = ()
+    from_date: date = None
+    to_date: date = None
+
+    @classmethod
+    def from_dashboard_args(cls, args):
+        """Parse the dashboard's toggle-style query parameters.
+
+        Multi-select categories win over the single category; unparseable dates are ignored.
+        """
+        category_ids = ()
+        if args.get('category_toggle') == 'on':
+            selected_categories = args.getlist('categories', type=int)
+            category_filter = args.get('category', type=int)
+            if selected_categories:
+                category_ids = selected_categories
+            elif category_filter:
+                category_ids = (category_filter,)
+        
+        from_date = to_date = None
+        if args.get('date_toggle') == 'on':
+            date_filter = args.get('date')
+            date_from = args.get('date_from')
+            date_to = args.get('date_to')
+            try:
+                if args.get('date_range_mode') == 'on' and date_from and date_to:
+                    from_date, to_date = parse_date(date_from), parse_date(date_to)
+                elif date_filter:
+                    from_date = to_date = parse_date(date_filter)
+            except ValueError:
+                pass
+        
+        return cls(tuple(sorted(set(category_ids))), from_date, to_date)
+
+    @classmethod
+    def from_api_args(cls, args):
+        """Parse /api/expenses parameters; raises ValueError on a bad category or date"""
+        category_filter = args.get('category')
+        date_from = args.get('date_from')
+        date_to = args.get('date_to')
+        category_ids = ()
+        if category_filter and category_filter != 'all':
+            category_ids = (int(category_filter),)
+        return cls(
+            category_ids,
+            parse_date(date_from) if date_from else None,
+            parse_date(date_to) if date_to else None
+        )
+
+    @property
+    def is_date_filtered(self):
+        return self.from_date is not None or self.to_date is not None
+
+    @property
+    def cache_key(self):
+        """Stable string form, for caches that need more than a hashable object"""
+        return '|'.join([
+            ','.join(str(category_id) for category_id in self.category_ids),
+            self.from_date.isoformat() if self.from_date else '',
+            self.to_date.isoformat() if self.to_date else ''
+        ])
+
+    def clause(self, date_column=Expense.date, category_column=Expense.category_id):
+        """Compile to a SQL condition; pass the rollup columns to filter ExpenseRollup instead"""
+        conditions = []
+        if self.category_ids:
+            conditions.append(category_column.in_(self.category_ids))
+        if self.from_date:
+            conditions.append(date_column >= self.from_date)
+        if self.to_date:
+            conditions.append(date_column <= self.to_date)
+        return and_(true(), *conditions)
+
+@dataclass(frozen=True)
+class DashboardStats:
+    """Figures shown on the dashboard and in its PDF export for one filter selection (amounts in cents)"""
+    total_spent_cents: int
+    total_expenses: int
+    month_spent_cents: int
+    # category_id -> (total_cents, count)
+    category_totals: dict
+
+def dashboard_stats(expense_filter):
+    """Dashboard figures for a filter, shared between the dashboard and its PDF via the cache"""
+    return response_cache.get_or_set(
+        versioned_cache_key('dashboard_stats', expense_filter.cache_key),
+        lambda: compute_dashboard_stats(expense_filter)
+    )
+
+def expense_count():
+    """Number of expenses, summed from the rollup table instead of a COUNT(*) over the ledger"""
+    return response_cache.get_or_set(
+        versioned_cache_key('expense_count'),
+        lambda: db.session.query(func.coalesce(func.sum(ExpenseRollup.count), 0)).scalar()
+    )
+
+def compute_dashboard_stats(expense_filter):
+    """Compute every dashboard figure in one grouped query over the rollup table.
+
+    The current-month spend is a conditional sum in the same pass; when a date filter
+    is active the dashboard shows the filtered total there instead.
+    """
+    month_start, next_month = month_bounds(date.today())
+    in_month = and_(ExpenseRollup.day >= month_start, ExpenseRollup.day < next_month)
+    query = db.session.query(
+        ExpenseRollup.category_id,
+        func.sum(ExpenseRollup.total_cents),
+        func.sum(ExpenseRollup.count),
+        func.sum(case((in_month, ExpenseRollup.total_cents), else_=0))
+    )
+    query = query.filter(expense_filter.clause(ExpenseRollup.day, ExpenseRollup.category_id))
+    # PostgreSQL sums bigints as numeric, so normalize to int
+    rows = [(category_id, int(total), int(count), int(month))
+            for category_id, total, count, month in query.group_by(ExpenseRollup.category_id)]
+    
+    total_spent = sum(total for _, total, _, _ in rows)
+    if expense_filter.is_date_filtered:
+        month_spent = total_spent
+    else:
+        month_spent = sum(month for _, _, _, month in rows)
+    return DashboardStats(
+        total_spent_cents=total_spent,
+        total_expenses=sum(count for _, _, count, _ in rows),
+        month_spent_cents=month_spent,
+        category_totals={category_id: (total, count) for category_id, total, count, _ in rows}
+    )
+
+def expense_validation_error(amount_cents, description, expense_date):
+    """Why an expense is invalid, or None; shared by the add/edit forms and bulk import"""
+    if amount_cents <= 0:
+        return 'Amount must be greater than 0'
+    if amount_cents > MAX_CENTS:
+        return f'Amount must be at most {format_cents(MAX_CENTS)}'
+    if not description:
+        return 'Description is required'
+    if expense_date > date.today():
+        return 'Date cannot be in the future'
+    return None
+
+@dataclass(frozen=True)
+class BudgetStatus:
+    """One category's budget against its spend for a month (amounts in cents)"""
+    category_id: int
+    category: str
+    budget_cents: int
+    spent_cents: int
+    # 'ok', 'warning' (at least BUDGET_WARNING_RATIO of the budget spent) or 'over'
+    status: str
+    
+    @property
+    def remaining_cents(self):
+        return self.budget_cents - self.spent_cents
+    
+    @property
+    def percent_used(self):
+        return round(self.spent_cents * 100 / self.budget_cents, 1)
+    
+    def to_dict(self):
+        return {
+            'category_id': self.category_id,
+            'category': self.category,
+            'budget': cents_to_float(self.budget_cents),
+            'spent': cents_to_float(self.spent_cents),
+            'remaining': cents_to_float(self.remaining_cents),
+            'percent_used': self.percent_used,
+            'status': self.status
         }
 
-@app.route('/')
+def budget_statuses(month=None):
+    """Budget status of every category with a budget, for month (default: the current month).
+
+    Reads one MonthlySpend counter per category by primary key, so the cost does not grow
+    with the ledger.
+    """
+    month_start = (month or date.today()).replace(day=1)
+    rows = db.session.query(
+        Category.id, Category.name, Category.monthly_budget_cents, MonthlySpend.spent_cents
+    ).outerjoin(
+        MonthlySpend, and_(MonthlySpend.category_id == Category.id, MonthlySpend.month == month_start)
+    ).filter(Category.monthly_budget_cents.isnot(None)).order_by(Category.name).all()
+    
+    warning_ratio = current_app.config['BUDGET_WARNING_RATIO']
+    statuses = []
+    for category_id, name, budget, spent in rows:
+        spent = int(spent or 0)
+        if spent > budget:
+            status = 'over'
+        elif spent >= budget * warning_ratio:
+            status = 'warning'
+        else:
+            status = 'ok'
+        statuses.append(BudgetStatus(category_id, name, budget, spent, status))
+    return statuses
+
+def parse_budget(value):
+    """Budget in cents from form or JSON input; None (no budget) for an empty value"""
+    if value is None or str(value).strip() == '':
+        return None
+    budget_cents = to_cents(value)
+    if not 0 < budget_cents <= MAX_CENTS:
+        raise ValueError(f'Budget must be between 0.01 and {format_cents(MAX_CENTS)}')
+    return budget_cents
+
+@bp.app_template_filter('money')
+def money_filter(cents):
+    """Format integer cents (or an average of them) as '1234.50' in templates"""
+    return format_cents(round(cents))
+
+@bp.before_request
+def load_tenant():
+    """Bind the request to its tenant: the one named in TENANT_HEADER with MULTI_TENANT, else the default"""
+    if current_app.config['MULTI_TENANT']:
+        header = current_app.config['TENANT_HEADER']
+        slug = request.headers.get(header, '').strip().lower()
+        if not slug:
+            return jsonify({'error': f'Missing {header} header'}), 400
+    else:
+        slug = DEFAULT_TENANT_SLUG
+    tenant = find_tenant(slug)
+    if tenant is None:
+        return jsonify({'error': f'Unknown tenant: {slug}'}), 404
+    use_tenant(tenant)
+
+@bp.route('/')
+@cached_view
 def index():
     # Get filter parameters
     date_filter = request.args.get('date', type=str)
@@ -58,106 +798,26 @@ def index():
     date_range_mode = request.args.get('date_range_mode', type=str) == 'on'
     category_toggle = request.args.get('category_toggle', type=str) == 'on'
     
-    # Get dashboard statistics based on current filters
-    filtered_query = Expense.query
-    
-    # Apply category filter only if category toggle is ON (prioritize multi-select over single select)
-    if category_toggle:
-        if selected_categories:
-            filtered_query = filtered_query.filter(Expense.category_id.in_(selected_categories))
-        elif category_filter:
-            filtered_query = filtered_query.filter(Expense.category_id == category_filter)
-    
-    # Apply date filter if toggle is ON
-    if date_toggle:
-        if date_range_mode and date_from and date_to:
-            # Date range mode: from-to dates
-            try:
-                from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-                to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-                filtered_query = filtered_query.filter(
-                    Expense.date >= from_date,
-                    Expense.date <= to_date
-                )
-            except ValueError:
-                pass
-        elif date_filter:
-            # Single date mode
-            try:
-                filter_date = datetime.strptime(date_filter, '%Y-%m-%d').date()
-                filtered_query = filtered_query.filter(Expense.date == filter_date)
-            except ValueError:
-                pass
-    
-    # Calculate filtered totals
-    total_spent = db.session.query(func.sum(Expense.amount)).filter(
-        Expense.id.in_(filtered_query.with_entities(Expense.id))
-    ).scalar() or 0
+    expense_filter = ExpenseFilter.from_dashboard_args(request.args)
     
-    # For monthly expenses, show filtered total or current month
-    if date_toggle and (date_filter or (date_range_mode and date_from and date_to)):
-        # When exact date or date range is selected, show that total
-        month_spent = total_spent
-    else:
-        # Get current month expenses with category filter if applied
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        month_query = db.session.query(func.sum(Expense.amount)).filter(
-            extract('year', Expense.date) == current_year,
-            extract('month', Expense.date) == current_month
-        )
-        if category_toggle:
-            if selected_categories:
-                month_query = month_query.filter(Expense.category_id.in_(selected_categories))
-            elif category_filter:
-                month_query = month_query.filter(Expense.category_id == category_filter)
-        month_spent = month_query.scalar() or 0
-    
-    # Get total expense count based on filters
-    total_expenses = filtered_query.count()
+    # Get dashboard statistics based on current filters
+    stats = dashboard_stats(expense_filter)
     
     # Get recent expenses with filtering
-    recent_query = Expense.query
-    
-    # Apply date filter - only if toggle is ON
-    if date_toggle:
-        if date_range_mode and date_from and date_to:
-            # Date range mode: from-to dates
-            try:
-                from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-                to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-                recent_query = recent_query.filter(
-                    Expense.date >= from_date,
-                    Expense.date <= to_date
-                )
-            except ValueError:
-                pass
-        elif date_filter:
-            # Single date mode
-            try:
-                filter_date = datetime.strptime(date_filter, '%Y-%m-%d').date()
-                recent_query = recent_query.filter(Expense.date == filter_date)
-            except ValueError:
-                pass
-    
-    # Apply category filter only if category toggle is ON
-    if category_toggle:
-        if selected_categories:
-            recent_query = recent_query.filter(Expense.category_id.in_(selected_categories))
-        elif category_filter:
-            recent_query = recent_query.filter(Expense.category_id == category_filter)
-    
-    recent_expenses = recent_query.order_by(Expense.date.desc()).limit(5).all()
+    recent_query = expense_listing_query().filter(expense_filter.clause())
+    recent_expenses = recent_query.order_by(Expense.date.desc(), Expense.id.desc()).limit(5).all()
     
     # Get all categories for filter dropdown
     categories = Category.query.all()
+    budgets = budget_statuses()
     
     return render_template('index.html', 
-                         total_spent=total_spent,
-                         month_spent=month_spent,
-                         total_expenses=total_expenses,
+                         total_spent_cents=stats.total_spent_cents,
+                         month_spent_cents=stats.month_spent_cents,
+                         total_expenses=stats.total_expenses,
                          recent_expenses=recent_expenses,
                          categories=categories,
+                         budgets=budgets,
                          selected_date=date_filter,
                          selected_date_from=date_from,
                          selected_date_to=date_to,
@@ -167,496 +827,1391 @@ def index():
                          date_range_mode_on=date_range_mode,
                          category_toggle_on=category_toggle)
 
-@app.route('/expenses')
+@dataclass
+class KeysetPage:
+    """A page of the expense list with the cursors leading to its neighbours"""
+    items: list
+    total: int
+    newer_cursor: str = None
+    older_cursor: str = None
+
+@bp.route('/expenses')
 def expenses():
-    page = request.args.get('page', 1, type=int)
-    per_page = 10
-    expenses = Expense.query.order_by(Expense.date.desc()).paginate(
-        page=page, per_page=per_page, error_out=False)
+    """Expense list, newest first.
+
+    Large ledgers are browsed with before/after cursors; page numbers (?page=N, OFFSET
+    based) are used when the ledger has at most EXPENSES_PAGE_NUMBERS_MAX_ROWS rows.
+    """
+    per_page = request.args.get('per_page', current_app.config['EXPENSES_PAGE_SIZE'], type=int)
+    per_page = min(max(per_page, 1), EXPENSES_MAX_PAGE_SIZE)
+    page = request.args.get('page', type=int)
+    try:
+        after = decode_cursor(request.args['after']) if request.args.get('after') else None
+        before = decode_cursor(request.args['before']) if request.args.get('before') else None
+    except ValueError:
+        flash('Invalid page link, showing the newest expenses.', 'error')
+        return redirect(url_for('main.expenses'))
+    
+    total = expense_count()
+    if page is None and not (after or before) and total <= current_app.config['EXPENSES_PAGE_NUMBERS_MAX_ROWS']:
+        page = 1
+    
+    query = expense_listing_query()
+    if page is not None:
+        expenses = query.order_by(Expense.date.desc(), Expense.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False, count=False)
+        expenses.total = total
+    else:
+        items, more = keyset_page(query, per_page, after=after, before=before)
+        expenses = KeysetPage(items, total)
+        if items:
+            if after or (before and more):
+                expenses.newer_cursor = encode_cursor(items[0].date, items[0].id)
+            if before or more:
+                expenses.older_cursor = encode_cursor(items[-1].date, items[-1].id)
     
     categories = Category.query.all()
-    return render_template('expenses.html', expenses=expenses, categories=categories)
+    return render_template('expenses.html', expenses=expenses, categories=categories, per_page=per_page)
 
-@app.route('/add_expense', methods=['GET', 'POST'])
+@bp.route('/add_expense', methods=['GET', 'POST'])
 def add_expense():
     if request.method == 'POST':
         try:
-            amount = float(request.form['amount'])
+            amount_cents = to_cents(request.form['amount'])
             description = request.form['description'].strip()
             expense_date = datetime.strptime(request.form['date'], '%Y-%m-%d').date()
             category_id = int(request.form['category_id'])
             is_monthly = 'is_monthly' in request.form
             
-            if amount <= 0:
-                flash('Amount must be greater than 0', 'error')
-                return redirect(url_for('add_expense'))
-            
-            if not description:
-                flash('Description is required', 'error')
-                return redirect(url_for('add_expense'))
-            
-            if expense_date > date.today():
-                flash('Date cannot be in the future', 'error')
-                return redirect(url_for('add_expense'))
+            error = expense_validation_error(amount_cents, description, expense_date)
+            if error:
+                flash(error, 'error')
+                return redirect(url_for('main.add_expense'))
+            # Scoped to the tenant, so another ledger's categories are not found
+            if db.session.get(Category, category_id) is None:
+                flash('Unknown category', 'error')
+                return redirect(url_for('main.add_expense'))
             
             expense = Expense(
-                amount=amount,
+                amount_cents=amount_cents,
                 description=description,
                 date=expense_date,
                 category_id=category_id,
                 is_monthly=is_monthly
             )
+            if is_monthly:
+                join_or_start_series(expense)
             
             db.session.add(expense)
+            adjust_rollup(expense_date, category_id, amount_cents, 1)
+            bump_data_version()
             db.session.commit()
             flash('Expense added successfully!', 'success')
-            return redirect(url_for('expenses'))
+            return redirect(url_for('main.expenses'))
             
         except ValueError as e:
             flash('Invalid input. Please check your data.', 'error')
-            return redirect(url_for('add_expense'))
+            return redirect(url_for('main.add_expense'))
         except Exception as e:
             flash('An error occurred while adding the expense.', 'error')
-            return redirect(url_for('add_expense'))
+            return redirect(url_for('main.add_expense'))
     
     categories = Category.query.all()
     return render_template('add_expense.html', categories=categories, today=date.today())
 
-@app.route('/edit_expense/<int:expense_id>', methods=['GET', 'POST'])
+@bp.route('/edit_expense/<int:expense_id>', methods=['GET', 'POST'])
 def edit_expense(expense_id):
     expense = Expense.query.get_or_404(expense_id)
     
     if request.method == 'POST':
         try:
-            amount = float(request.form['amount'])
+            amount_cents = to_cents(request.form['amount'])
             description = request.form['description'].strip()
             expense_date = datetime.strptime(request.form['date'], '%Y-%m-%d').date()
             category_id = int(request.form['category_id'])
             is_monthly = 'is_monthly' in request.form
             
-            if amount <= 0:
-                flash('Amount must be greater than 0', 'error')
-                return redirect(url_for('edit_expense', expense_id=expense_id))
-            
-            if not description:
-                flash('Description is required', 'error')
-                return redirect(url_for('edit_expense', expense_id=expense_id))
+            error = expense_validation_error(amount_cents, description, expense_date)
+            if error:
+                flash(error, 'error')
+                return redirect(url_for('main.edit_expense', expense_id=expense_id))
+            if db.session.get(Category, category_id) is None:
+                flash('Unknown category', 'error')
+                return redirect(url_for('main.edit_expense', expense_id=expense_id))
             
-            if expense_date > date.today():
-                flash('Date cannot be in the future', 'error')
-                return redirect(url_for('edit_expense', expense_id=expense_id))
+            adjust_rollup(expense.date, expense.category_id, -expense.amount_cents, -1)
+            adjust_rollup(expense_date, category_id, amount_cents, 1)
             
-            expense.amount = amount
+            expense.amount_cents = amount_cents
             expense.description = description
             expense.date = expense_date
             expense.category_id = category_id
             expense.is_monthly = is_monthly
             expense.updated_at = datetime.utcnow()
+            if not is_monthly:
+                # Un-ticking monthly on a template stops its series
+                expense.is_recurring_template = False
+            elif not expense.is_recurring_template and expense.recurring_source_id is None:
+                join_or_start_series(expense)
+            elif expense.is_recurring_template:
+                # Moving a template later restarts its series from the new date, never earlier
+                expense.recurring_through = max(expense.recurring_through or expense_date, expense_date)
             
+            bump_data_version()
             db.session.commit()
             flash('Expense updated successfully!', 'success')
-            return redirect(url_for('expenses'))
+            return redirect(url_for('main.expenses'))
             
         except ValueError as e:
             flash('Invalid input. Please check your data.', 'error')
-            return redirect(url_for('edit_expense', expense_id=expense_id))
+            return redirect(url_for('main.edit_expense', expense_id=expense_id))
         except Exception as e:
             flash('An error occurred while updating the expense.', 'error')
-            return redirect(url_for('edit_expense', expense_id=expense_id))
+            return redirect(url_for('main.edit_expense', expense_id=expense_id))
     
     categories = Category.query.all()
     return render_template('edit_expense.html', expense=expense, categories=categories, today=date.today())
 
-@app.route('/delete_expense/<int:expense_id>', methods=['POST'])
+@bp.route('/delete_expense/<int:expense_id>', methods=['POST'])
 def delete_expense(expense_id):
     try:
         expense = Expense.query.get_or_404(expense_id)
+        adjust_rollup(expense.date, expense.category_id, -expense.amount_cents, -1)
         db.session.delete(expense)
+        bump_data_version()
         db.session.commit()
         flash('Expense deleted successfully!', 'success')
     except Exception as e:
         flash('An error occurred while deleting the expense.', 'error')
     
-    return redirect(url_for('expenses'))
+    return redirect(url_for('main.expenses'))
+
+def add_months(day, months, anchor_day):
+    """The date months after day's month, on anchor_day (clamped to short months)"""
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    month += 1
+    return date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+
+def due_occurrences(template_date, last_date, until):
+    """Monthly dates on template_date's day of month after last_date, up to and including until"""
+    months = 1
+    occurrence = add_months(last_date, months, template_date.day)
+    while occurrence <= until:
+        yield occurrence
+        months += 1
+        occurrence = add_months(last_date, months, template_date.day)
+
+def join_or_start_series(expense):
+    """Make an expense just marked monthly the template of a new series, or an occurrence of its existing one.
+
+    Re-entering a bill that already recurs (same description, category and amount) joins
+    that series instead of starting another, which would generate every month twice. A
+    re-entry on a date the series already has stays a plain monthly expense.
+    """
+    query = Expense.query.filter(
+        Expense.is_recurring_template == True,
+        Expense.description == expense.description,
+        Expense.category_id == expense.category_id,
+        Expense.amount_cents == expense.amount_cents
+    )
+    if expense.id is not None:
+        query = query.filter(Expense.id != expense.id)
+    template = query.order_by(Expense.id).first()
+    if template is None:
+        expense.is_recurring_template = True
+        expense.recurring_source_id = None
+        expense.recurring_through = expense.date
+        return
+    expense.is_recurring_template = False
+    date_taken = template.date == expense.date or Expense.query.filter(
+        Expense.recurring_source_id == template.id, Expense.date == expense.date).first() is not None
+    if not date_taken:
+        expense.recurring_source_id = template.id
+        template.recurring_through = max(template.recurring_through or template.date, expense.date)
+
+def recurring_templates(batch_size=RECURRING_BATCH_SIZE):
+    """Recurring templates, in id-ordered batches.
+
+    Only the indexed template rows are read, never the ledger: each carries its own
+    recurring_through, so occurrences deleted since don't change where the series resumes.
+    """
+    last_id = 0
+    while True:
+        templates = db.session.query(
+            Expense.id, Expense.tenant_id, Expense.amount_cents, Expense.description, Expense.date,
+            Expense.category_id, Expense.recurring_through
+        ).filter(
+            Expense.is_recurring_template == True, Expense.id > last_id
+        ).order_by(Expense.id).limit(batch_size).all()
+        if not templates:
+            return
+        last_id = templates[-1].id
+        yield templates
+
+def series_key(template, day):
+    return (template.tenant_id, template.description, template.category_id, template.amount_cents, day.year, day.month)
+
+def entered_months(due):
+    """series_key of every (template, occurrence) in due whose month the ledger already holds.
+
+    That is the same expense (description, category and amount), say one entered by hand or
+    imported, in the occurrence's month. One query for the whole batch.
+    """
+    return {
+        series_key(row, row.date) for row in db.session.query(
+            Expense.tenant_id, Expense.description, Expense.category_id, Expense.amount_cents, Expense.date
+        ).filter(
+            tuple_(Expense.description, Expense.category_id, Expense.amount_cents).in_(
+                list({(template.description, template.category_id, template.amount_cents) for template, _ in due})),
+            Expense.date >= min(occurrence for _, occurrence in due).replace(day=1),
+            Expense.date <= max(occurrence for _, occurrence in due)
+        )
+    }
+
+def materialize_recurring(as_of=None):
+    """Insert every monthly occurrence due up to as_of (default today).
+
+    Each template resumes after its recurring_through, so missed months are caught up,
+    running again inserts nothing and deleting an occurrence skips that month for good.
+    Months the ledger already holds are skipped (see entered_months). Returns the number of
+    occurrences inserted.
+    """
+    as_of = as_of or date.today()
+    table = Expense.__table__
+    inserted = 0
+    for templates in recurring_templates():
+        due = [
+            (template, occurrence)
+            for template in templates
+            for occurrence in due_occurrences(template.date, template.recurring_through, as_of)
+        ]
+        if not due:
+            continue
+        entered = entered_months(due)
+        values = [
+            {
+                'tenant_id': template.tenant_id,
+                'amount_cents': template.amount_cents,
+                'description': template.description,
+                'date': occurrence,
+                'category_id': template.category_id,
+                'is_monthly': True,
+                'recurring_source_id': template.id
+            }
+            for template, occurrence in due
+            if series_key(template, occurrence) not in entered
+        ]
+        # Occurrences come in date order, so the last one per template is how far it got
+        through = {template.id: occurrence for template, occurrence in due}
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('template_id')).values(
+                recurring_through=bindparam('through')),
+            [{'template_id': template_id, 'through': day} for template_id, day in through.items()])
+        if values:
+            insert_expense_batch(values)
+            inserted += len(values)
+        else:
+            db.session.commit()
+    return inserted
+
+def recurring_projection(months=PROJECTION_MONTHS, as_of=None):
+    """Projected spend for the current month and the following ones.
+
+    Returns (month_start, recorded, recurring_due) per month in cents: what the ledger already
+    holds (the current month only) and the monthly occurrences not yet materialized, counted
+    from each template's recurring_through in one NumPy pass (see analytics.recurring_due).
+    Returns None when NumPy is not installed.
+    """
+    try:
+        import numpy as np
+        import analytics
+    except ImportError:
+        return None
+    as_of = as_of or date.today()
+    month_start, next_month = month_bounds(as_of)
+    recorded = int(db.session.query(func.sum(ExpenseRollup.total_cents)).filter(
+        ExpenseRollup.day >= month_start, ExpenseRollup.day < next_month
+    ).scalar() or 0)
+    
+    # Only the indexed template rows: amount and the month each series has been materialized through
+    templates = fetch_array(db.select(
+        Expense.amount_cents,
+        extract('year', Expense.recurring_through) * 12 + extract('month', Expense.recurring_through)
+    ).where(Expense.is_recurring_template == True, tenant_clause(Expense)), np)
+    due = analytics.recurring_due(templates[:, 0], templates[:, 1], month_start.year * 12 + month_start.month, months)
+    
+    return [
+        (add_months(month_start, offset, 1), recorded if offset == 0 else 0, due[offset])
+        for offset in range(months)
+    ]
 
-@app.route('/reports')
+def fetch_array(statement, np):
+    """Run a SELECT of numeric columns and return its rows as one float64 NumPy array.
+
+    Reads the DB-API cursor directly: at a million rows SQLAlchemy's per-row Row objects
+    cost several times the query itself. Filter values are rendered inline, which is safe
+    because they are already-parsed dates and integers. The statement bypasses the session's
+    tenant scoping, so it must carry its own tenant_clause.
+    """
+    sql = str(statement.compile(db.session.get_bind(), compile_kwargs={'literal_binds': True}))
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.execute(sql)
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(ANALYTICS_FETCH_SIZE)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.float64))
+    finally:
+        cursor.close()
+    return np.concatenate(chunks) if chunks else np.empty((0, len(statement.selected_columns)))
+
+def reports_analytics(expense_filter):
+    """Pivot, trends and distribution for a filter (see analytics.py), cached per data version.
+
+    Returns None when NumPy is not installed.
+    """
+    try:
+        import numpy as np
+        import analytics
+    except ImportError:
+        return None
+    return response_cache.get_or_set(
+        versioned_cache_key('analytics', expense_filter.cache_key),
+        lambda: compute_reports_analytics(expense_filter, analytics, np)
+    )
+
+def compute_reports_analytics(expense_filter, analytics, np):
+    # Date-based figures come from the daily rollups; percentiles and top-N need each expense
+    rollups = db.session.query(ExpenseRollup.day, ExpenseRollup.category_id, ExpenseRollup.total_cents).filter(
+        expense_filter.clause(ExpenseRollup.day, ExpenseRollup.category_id)
+    ).all()
+    days, day_categories, day_totals = zip(*rollups) if rollups else ((), (), ())
+    ledger = fetch_array(
+        db.select(Expense.id, Expense.amount_cents, Expense.category_id).where(
+            expense_filter.clause(), tenant_clause(Expense)), np)
+    
+    result = analytics.ledger_analytics(
+        np.array(days, dtype='datetime64[D]'),
+        np.array(day_categories, dtype=np.int64),
+        np.array(day_totals, dtype=np.float64),
+        ledger[:, 0].astype(np.int64),
+        ledger[:, 1],
+        ledger[:, 2].astype(np.int64),
+        dict(db.session.query(Category.id, Category.name).all()),
+        date.today()
+    )
+    top_ids = result.pop('top_expense_ids')
+    top = {expense.id: expense for expense in expense_listing_query().filter(Expense.id.in_(top_ids))}
+    result['top_expenses'] = [top[expense_id].to_dict() for expense_id in top_ids if expense_id in top]
+    return result
+
+@bp.route('/reports')
+@cached_view
 def reports():
-    total_spent = db.session.query(func.sum(Expense.amount)).scalar() or 0
+    # Totals come from the rollup table: one row per day and category, not per expense
+    total_spent_cents = int(db.session.query(func.sum(ExpenseRollup.total_cents)).scalar() or 0)
     
     category_summary = db.session.query(
         Category.name,
-        func.sum(Expense.amount).label('total')
-    ).join(Expense).group_by(Category.id, Category.name).all()
+        func.sum(ExpenseRollup.total_cents).label('total')
+    ).join(ExpenseRollup, ExpenseRollup.category_id == Category.id).group_by(Category.id, Category.name).all()
     
     monthly_summary = db.session.query(
-        extract('year', Expense.date).label('year'),
-        extract('month', Expense.date).label('month'),
-        func.sum(Expense.amount).label('total')
+        extract('year', ExpenseRollup.day).label('year'),
+        extract('month', ExpenseRollup.day).label('month'),
+        func.sum(ExpenseRollup.total_cents).label('total')
     ).group_by(
-        extract('year', Expense.date),
-        extract('month', Expense.date)
+        extract('year', ExpenseRollup.day),
+        extract('month', ExpenseRollup.day)
     ).order_by('year', 'month').all()
     
-    recent_expenses = Expense.query.order_by(Expense.date.desc()).limit(5).all()
+    recent_expenses = expense_listing_query().order_by(Expense.date.desc(), Expense.id.desc()).limit(5).all()
+    projection = recurring_projection()
+    analytics = reports_analytics(ExpenseFilter())
     
     return render_template('reports.html',
-                         total_spent=total_spent,
+                         total_spent_cents=total_spent_cents,
                          category_summary=category_summary,
                          monthly_summary=monthly_summary,
-                         recent_expenses=recent_expenses)
+                         recent_expenses=recent_expenses,
+                         projection=projection,
+                         analytics=analytics)
+
+@bp.route('/api/budgets')
+def api_budgets():
+    """Budget, spend and remaining per category for month=YYYY-MM (default: this month)"""
+    try:
+        month = datetime.strptime(request.args['month'], '%Y-%m').date() if 'month' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'month must be YYYY-MM'}), 400
+    # Without ?month= the response changes when a new month starts, so validate against the resolved one
+    month = month or date.today().replace(day=1)
+    
+    etag, last_modified, not_modified = conditional_headers(
+        request.path, normalized_args(request.args), as_of=month)
+    if not_modified:
+        return not_modified_response(etag, last_modified)
+    
+    budgets = [budget.to_dict() for budget in budget_statuses(month)]
+    response = jsonify({
+        'month': month.strftime('%Y-%m'),
+        'budgets': budgets,
+        'alerts': [budget for budget in budgets if budget['status'] != 'ok']
+    })
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+@bp.route('/api/budgets/<int:category_id>', methods=['PUT'])
+def api_set_budget(category_id):
+    """Set a category's monthly budget from {"budget": 250.0}; null clears it"""
+    category = Category.query.get_or_404(category_id)
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or 'budget' not in payload:
+        return jsonify({'error': 'Expected a JSON object with a budget'}), 400
+    try:
+        category.monthly_budget_cents = parse_budget(payload['budget'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    bump_data_version()
+    db.session.commit()
+    return jsonify({
+        'category_id': category.id,
+        'category': category.name,
+        'budget': cents_to_float(category.monthly_budget_cents) if category.monthly_budget_cents is not None else None
+    })
+
+@bp.route('/api/reports/analytics')
+def api_reports_analytics():
+    """The reports analytics as JSON, with the /api/expenses filters (needs numpy)"""
+    try:
+        expense_filter = ExpenseFilter.from_api_args(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid category or date filter'}), 400
+    
+    etag, last_modified, not_modified = conditional_headers(
+        request.path, normalized_args(request.args), as_of=date.today())
+    if not_modified:
+        return not_modified_response(etag, last_modified)
+    
+    analytics = reports_analytics(expense_filter)
+    if analytics is None:
+        return jsonify({'error': 'Analytics require numpy to be installed'}), 400
+    response = jsonify(analytics)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
 
-@app.route('/api/expenses')
+@bp.route('/api/expenses')
 def api_expenses():
-    category_filter = request.args.get('category')
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', type=int)
+    
+    try:
+        expense_filter = ExpenseFilter.from_api_args(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid category or date filter'}), 400
+    try:
+        fields = parse_fields(request.args.get('fields'), EXPENSE_API_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Answer polling clients that already hold this data version without querying
+    etag, last_modified, not_modified = conditional_headers(request.path, normalized_args(request.args))
+    if not_modified:
+        return not_modified_response(etag, last_modified)
     
-    query = Expense.query
+    query, serializer = expense_api_rows(fields)
+    query = query.filter(expense_filter.clause())
     
-    if category_filter and category_filter != 'all':
-        query = query.filter(Expense.category_id == category_filter)
+    # Paginated mode: one page, resuming after the last row of the previous one, plus a token for the next
+    if cursor or limit:
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        limit = min(max(limit or API_PAGE_SIZE, 1), API_MAX_PAGE_SIZE)
+        rows, more = keyset_page(query, limit, after=after)
+        next_cursor = encode_cursor(rows[-1].cursor_date, rows[-1].cursor_id) if more else None
+        response = Response(dumps({
+            'expenses': serializer.dicts(rows),
+            'next_cursor': next_cursor
+        }), mimetype='application/json')
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return response
     
-    if date_from:
-        query = query.filter(Expense.date >= datetime.strptime(date_from, '%Y-%m-%d').date())
+    # Full listing: stream the JSON array a batch of rows at a time instead of building it in memory
+    statement = query.order_by(Expense.date.desc(), Expense.id.desc()).statement.execution_options(
+        yield_per=API_STREAM_CHUNK)
     
-    if date_to:
-        query = query.filter(Expense.date <= datetime.strptime(date_to, '%Y-%m-%d').date())
+    def generate():
+        yield b'['
+        separator = b''
+        for rows in db.session.execute(statement).partitions():
+            yield separator + serializer.encode_items(rows)
+            separator = b','
+        yield b']'
     
-    expenses = query.order_by(Expense.date.desc()).all()
-    return jsonify([expense.to_dict() for expense in expenses])
+    response = Response(stream_with_context(generate()), mimetype='application/json')
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
 
-@app.route('/categories')
+def encode_cursor(expense_date, expense_id):
+    """Build an opaque pagination token from the (date, id) of the last row served"""
+    raw = f'{expense_date.isoformat()}:{expense_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; raises ValueError on a malformed token"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        date_part, id_part = raw.split(':')
+        return datetime.strptime(date_part, '%Y-%m-%d').date(), int(id_part)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {token}') from e
+
+# SQLite FTS5 index over expense descriptions (created by create_search_index)
+expense_fts = table('expense_fts', column('rowid'))
+
+def search_backend():
+    """'fts5', 'tsvector' or 'like' for the current database, detected once per app"""
+    backend = current_app.extensions.get('search_backend')
+    if backend is None:
+        bind = db.session.get_bind()
+        dialect = bind.dialect.name
+        if dialect == 'postgresql':
+            backend = 'tsvector'
+        elif dialect == 'sqlite' and db.inspect(bind).has_table('expense_fts'):
+            backend = 'fts5'
+        else:
+            backend = 'like'
+        current_app.extensions['search_backend'] = backend
+    return backend
+
+def search_query(query, terms, sort='rank'):
+    """Narrow an expense query to rows matching every term (as a word prefix), ordered by relevance or date"""
+    backend = search_backend()
+    if backend == 'fts5':
+        fts = literal_column('expense_fts')
+        query = query.join(expense_fts, expense_fts.c.rowid == Expense.id).filter(
+            fts.op('MATCH')(' '.join(f'"{term}"*' for term in terms)))
+        rank = func.bm25(fts)
+    elif backend == 'tsvector':
+        # Must match the expression of ix_expense_description_search to use the GIN index
+        vector = func.to_tsvector(literal_column("'simple'"), Expense.description)
+        tsquery = func.to_tsquery(literal_column("'simple'"), ' & '.join(f'{term}:*' for term in terms))
+        query = query.filter(vector.op('@@')(tsquery))
+        rank = -func.ts_rank(vector, tsquery)
+    else:
+        query = query.filter(*[Expense.description.icontains(term, autoescape=True) for term in terms])
+        sort = 'date'
+    
+    if sort == 'rank':
+        return query.order_by(rank, Expense.date.desc(), Expense.id.desc())
+    return query.order_by(Expense.date.desc(), Expense.id.desc())
+
+@bp.route('/api/expenses/search')
+def api_search_expenses():
+    """Expenses whose description contains every word of q (prefixes match), best matches first.
+
+    Takes the /api/expenses filters and fields, sort=rank|date, limit and a 1-based page.
+    """
+    terms = re.findall(r'\w+', request.args.get('q', ''))
+    if not terms:
+        return jsonify({'error': 'q must contain at least one word'}), 400
+    sort = request.args.get('sort', 'rank')
+    if sort not in ('rank', 'date'):
+        return jsonify({'error': 'sort must be rank or date'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    limit = min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+    try:
+        expense_filter = ExpenseFilter.from_api_args(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid category or date filter'}), 400
+    try:
+        fields = parse_fields(request.args.get('fields'), EXPENSE_API_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    etag, last_modified, not_modified = conditional_headers(request.path, normalized_args(request.args))
+    if not_modified:
+        return not_modified_response(etag, last_modified)
+    
+    query, serializer = expense_api_rows(fields)
+    rows = search_query(query, terms, sort).filter(
+        expense_filter.clause()
+    ).offset((page - 1) * limit).limit(limit + 1).all()
+    
+    response = Response(dumps({
+        'expenses': serializer.dicts(rows[:limit]),
+        'page': page,
+        'next_page': page + 1 if len(rows) > limit else None
+    }), mimetype='application/json')
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+def parse_import_row(row, category_ids_by_name, valid_category_ids):
+    """Turn one CSV/JSON-lines record into insert values; raises ValueError with the reason"""
+    try:
+        amount_cents = to_cents(row['amount'])
+        expense_date = parse_date(str(row['date']).strip())
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Invalid input. amount and date (YYYY-MM-DD) are required')
+    description = str(row.get('description') or '').strip()
+    
+    error = expense_validation_error(amount_cents, description, expense_date)
+    if error:
+        raise ValueError(error)
+    
+    if row.get('category_id') not in (None, ''):
+        try:
+            category_id = int(row['category_id'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid category_id: {row['category_id']}")
+        if category_id not in valid_category_ids:
+            raise ValueError(f'Unknown category_id: {category_id}')
+    else:
+        category_name = str(row.get('category') or '').strip().title()
+        if category_name not in category_ids_by_name:
+            raise ValueError(f'Unknown category: {category_name or "(none)"}')
+        category_id = category_ids_by_name[category_name]
+    
+    is_monthly = row.get('is_monthly')
+    if isinstance(is_monthly, str):
+        is_monthly = is_monthly.strip().lower() in ('1', 'true', 'yes', 'on')
+    
+    now = datetime.utcnow()
+    return {
+        'amount_cents': amount_cents,
+        'description': description,
+        'date': expense_date,
+        'category_id': category_id,
+        'is_monthly': bool(is_monthly),
+        'created_at': now,
+        'updated_at': now
+    }
+
+def insert_expense_batch(values):
+    """Insert a batch with one executemany and update rollups, all in one transaction.
+
+    Rows without a tenant_id belong to the bound tenant.
+    """
+    db.session.execute(Expense.__table__.insert(), values)
+    tenant_id = default_tenant_id()
+    rollup_deltas = {}
+    for row in values:
+        key = (row.get('tenant_id', tenant_id), row['date'], row['category_id'])
+        total, count = rollup_deltas.get(key, (0, 0))
+        rollup_deltas[key] = (total + row['amount_cents'], count + 1)
+    for (row_tenant_id, day, category_id), (total, count) in rollup_deltas.items():
+        adjust_rollup(day, category_id, total, count, row_tenant_id)
+    bump_data_version()
+    db.session.commit()
+
+EXPORT_COLUMNS = ['id', 'date', 'amount', 'description', 'category', 'is_monthly', 'created_at']
+
+def export_batches(expense_filter):
+    """Matching expenses as batches of plain row tuples (no ORM objects), oldest first"""
+    statement = db.select(
+        Expense.id, Expense.date, Expense.amount_cents, Expense.description,
+        Category.name, Expense.is_monthly, Expense.created_at
+    ).join(Category, Expense.category_id == Category.id).where(
+        expense_filter.clause()
+    ).order_by(Expense.date, Expense.id).execution_options(yield_per=EXPORT_FETCH_SIZE)
+    return db.session.execute(statement).partitions()
+
+def csv_export(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows(
+            (expense_id, expense_date.isoformat(), format_cents(amount_cents), description, category, int(is_monthly),
+             created_at.isoformat(sep=' ', timespec='seconds') if created_at else '')
+            for expense_id, expense_date, amount_cents, description, category, is_monthly, created_at in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def arrow_export(batches, pa):
+    """Arrow IPC stream, one record batch per DB batch; amount_cents is the exact integer amount"""
+    import pyarrow.compute as pc
+    schema = pa.schema([
+        ('id', pa.int64()), ('date', pa.date32()), ('amount', pa.float64()),
+        ('description', pa.string()), ('category', pa.dictionary(pa.int32(), pa.string())),
+        ('is_monthly', pa.bool_()), ('created_at', pa.timestamp('us')), ('amount_cents', pa.int64())
+    ])
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for batch in batches:
+        ids, dates, cents, descriptions, categories, monthly, created = zip(*batch)
+        cents = pa.array(cents, pa.int64())
+        writer.write_batch(pa.record_batch([
+            pa.array(ids, pa.int64()), pa.array(dates, pa.date32()),
+            pc.divide(cents.cast(pa.float64()), 100.0), pa.array(descriptions, pa.string()),
+            pa.array(categories, pa.string()).dictionary_encode(), pa.array(monthly, pa.bool_()),
+            pa.array(created, pa.timestamp('us')), cents
+        ], schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+def npz_export(batches, np):
+    """Compressed NumPy archive; dates are day ordinals, categories are codes into category_names.
+
+    amount_cents holds the exact integer amounts, amount the same values as float dollars.
+    """
+    ids, ordinals, amounts, descriptions, codes, monthly = [], [], [], [], [], []
+    category_codes = {}
+    for batch in batches:
+        for expense_id, expense_date, amount_cents, description, category, is_monthly, _ in batch:
+            ids.append(expense_id)
+            ordinals.append(expense_date.toordinal())
+            amounts.append(amount_cents)
+            descriptions.append(description)
+            codes.append(category_codes.setdefault(category, len(category_codes)))
+            monthly.append(is_monthly)
+    amount_cents = np.array(amounts, dtype=np.int64)
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        id=np.array(ids, dtype=np.int64),
+        date_ordinal=np.array(ordinals, dtype=np.int32),
+        amount=amount_cents / 100,
+        amount_cents=amount_cents,
+        description=np.array(descriptions, dtype=str),
+        category_code=np.array(codes, dtype=np.int32),
+        category_names=np.array(list(category_codes), dtype=str),
+        is_monthly=np.array(monthly, dtype=bool)
+    )
+    return buffer.getvalue()
+
+@bp.route('/api/expenses/export')
+def api_export_expenses():
+    """Bulk export for analytics: format=csv (default), arrow (needs pyarrow) or npz (needs numpy)"""
+    export_format = request.args.get('format', 'csv')
+    try:
+        expense_filter = ExpenseFilter.from_api_args(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid category or date filter'}), 400
+    
+    # The columnar formats are optional extras, imported only when asked for
+    if export_format == 'arrow':
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return jsonify({'error': 'Arrow export requires pyarrow to be installed'}), 400
+    elif export_format == 'npz':
+        try:
+            import numpy as np
+        except ImportError:
+            return jsonify({'error': 'npz export requires numpy to be installed'}), 400
+    elif export_format != 'csv':
+        return jsonify({'error': 'format must be csv, arrow or npz'}), 400
+    
+    etag, last_modified, not_modified = conditional_headers(request.path, normalized_args(request.args))
+    if not_modified:
+        return not_modified_response(etag, last_modified)
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    batches = export_batches(expense_filter)
+    if export_format == 'csv':
+        response = Response(stream_with_context(csv_export(batches)), mimetype='text/csv')
+        filename = f'expenses_{timestamp}.csv'
+    elif export_format == 'arrow':
+        response = Response(stream_with_context(arrow_export(batches, pa)),
+                            mimetype='application/vnd.apache.arrow.stream')
+        filename = f'expenses_{timestamp}.arrows'
+    else:
+        response = Response(npz_export(batches, np), mimetype='application/octet-stream')
+        filename = f'expenses_{timestamp}.npz'
+    
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+@bp.route('/api/expenses/import', methods=['POST'])
+def api_import_expenses():
+    """Bulk-load expenses from a streamed CSV (with header) or JSON-lines request body.
+
+    Each record needs amount, description, date and category (name) or category_id, plus
+    optional is_monthly. Valid rows are committed in batches; invalid ones are skipped
+    and reported with their line number. A body that is not UTF-8 (a BOM is accepted) or
+    not readable as CSV stops the import with a 400, keeping the rows read before it.
+    """
+    import_format = request.args.get('format')
+    if not import_format:
+        import_format = 'jsonl' if 'json' in (request.mimetype or '') else 'csv'
+    if import_format not in ('csv', 'jsonl'):
+        return jsonify({'error': 'format must be csv or jsonl'}), 400
+    
+    # Resolve categories once for the whole upload
+    categories = Category.query.all()
+    category_ids_by_name = {category.name: category.id for category in categories}
+    valid_category_ids = set(category_ids_by_name.values())
+    
+    # utf-8-sig drops the byte order mark spreadsheet exports put before the header
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    if import_format == 'csv':
+        records = enumerate(csv.DictReader(stream), start=2)
+    else:
+        records = ((line_number, line) for line_number, line in enumerate(stream, start=1) if line.strip())
+    
+    started = time.perf_counter()
+    imported = failed = 0
+    errors = []
+    batch = []
+    body_error = None
+    try:
+        for line_number, record in records:
+            try:
+                if import_format == 'jsonl':
+                    try:
+                        record = json.loads(record)
+                    except ValueError:
+                        raise ValueError('Invalid JSON')
+                    if not isinstance(record, dict):
+                        raise ValueError('Each line must be a JSON object')
+                batch.append(parse_import_row(record, category_ids_by_name, valid_category_ids))
+            except ValueError as e:
+                failed += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({'line': line_number, 'error': str(e)})
+                continue
+            
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                insert_expense_batch(batch)
+                imported += len(batch)
+                batch = []
+    except UnicodeDecodeError:
+        body_error = 'Request body is not valid UTF-8'
+    except csv.Error as e:
+        body_error = f'Malformed CSV: {e}'
+    
+    if batch:
+        insert_expense_batch(batch)
+        imported += len(batch)
+    
+    elapsed = time.perf_counter() - started
+    result = {
+        'imported': imported,
+        'failed': failed,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round((imported + failed) / elapsed) if elapsed else None
+    }
+    if body_error:
+        result['error'] = body_error
+        return jsonify(result), 400
+    return jsonify(result), 200 if imported or not failed else 400
+
+@bp.route('/api/recurring/materialize', methods=['POST'])
+def api_materialize_recurring():
+    """Generate due monthly occurrences; for schedulers that call HTTP instead of the CLI"""
+    started = time.perf_counter()
+    inserted = materialize_recurring()
+    return jsonify({'inserted': inserted, 'seconds': round(time.perf_counter() - started, 3)})
+
+@bp.route('/api/cache_stats')
+def api_cache_stats():
+    return jsonify(response_cache.stats())
+
+@bp.route('/categories')
 def categories():
     categories = Category.query.all()
-    return render_template('categories.html', categories=categories)
+    # One grouped count instead of loading every category's expenses
+    expense_counts = dict(db.session.query(
+        Expense.category_id, func.count(Expense.id)
+    ).group_by(Expense.category_id).all())
+    return render_template('categories.html', categories=categories, expense_counts=expense_counts)
 
-@app.route('/add_category', methods=['GET', 'POST'])
+@bp.route('/add_category', methods=['GET', 'POST'])
 def add_category():
     if request.method == 'POST':
         try:
             name = request.form['name'].strip().title()
             description = request.form.get('description', '').strip()
+            try:
+                monthly_budget_cents = parse_budget(request.form.get('monthly_budget'))
+            except ValueError as e:
+                flash(str(e), 'error')
+                return redirect(url_for('main.add_category'))
             
             if not name:
                 flash('Category name is required', 'error')
-                return redirect(url_for('add_category'))
+                return redirect(url_for('main.add_category'))
             
             existing_category = Category.query.filter_by(name=name).first()
             if existing_category:
                 flash('Category already exists', 'error')
-                return redirect(url_for('add_category'))
+                return redirect(url_for('main.add_category'))
             
-            category = Category(name=name, description=description)
+            category = Category(name=name, description=description, monthly_budget_cents=monthly_budget_cents)
             db.session.add(category)
+            bump_data_version()
             db.session.commit()
             flash('Category added successfully!', 'success')
-            return redirect(url_for('categories'))
+            return redirect(url_for('main.categories'))
             
         except Exception as e:
             flash('An error occurred while adding the category.', 'error')
-            return redirect(url_for('add_category'))
+            return redirect(url_for('main.add_category'))
     
     return render_template('add_category.html')
 
-@app.route('/delete_category/<int:category_id>', methods=['POST'])
+@bp.route('/categories/<int:category_id>/budget', methods=['POST'])
+def set_category_budget(category_id):
+    """Set or (with an empty value) clear a category's monthly budget"""
+    category = Category.query.get_or_404(category_id)
+    try:
+        category.monthly_budget_cents = parse_budget(request.form.get('monthly_budget'))
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('main.categories'))
+    bump_data_version()
+    db.session.commit()
+    flash('Budget updated successfully!', 'success')
+    return redirect(url_for('main.categories'))
+
+@bp.route('/delete_category/<int:category_id>', methods=['POST'])
 def delete_category(category_id):
     try:
         category = Category.query.get_or_404(category_id)
         
-        if category.expenses:
+        if db.session.query(Expense.query.filter_by(category_id=category_id).exists()).scalar():
             flash('Cannot delete category with existing expenses. Move or delete expenses first.', 'error')
-            return redirect(url_for('categories'))
+            return redirect(url_for('main.categories'))
         
         db.session.delete(category)
+        bump_data_version()
         db.session.commit()
         flash('Category deleted successfully!', 'success')
     except Exception as e:
         flash('An error occurred while deleting the category.', 'error')
     
-    return redirect(url_for('categories'))
+    return redirect(url_for('main.categories'))
 
-def init_db():
-    with app.app_context():
-        db.create_all()
-        
-        if not Category.query.first():
-            default_categories = [
-                Category(name='Food & Dining', description='Restaurants, groceries, and food delivery'),
-                Category(name='Transportation', description='Gas, public transport, ride-sharing'),
-                Category(name='Shopping', description='Clothing, electronics, general shopping'),
-                Category(name='Bills & Utilities', description='Electricity, water, internet, phone bills'),
-                Category(name='Entertainment', description='Movies, games, subscriptions'),
-                Category(name='Healthcare', description='Medical expenses, pharmacy, insurance'),
-                Category(name='Travel', description='Hotels, flights, vacation expenses'),
-                Category(name='Education', description='Books, courses, educational materials'),
-                Category(name='Other', description='Miscellaneous expenses')
-            ]
-            
-            for category in default_categories:
-                db.session.add(category)
-            
-            db.session.commit()
-            print("Database initialized with default categories!")
+def add_missing_columns(model):
+    """Add columns defined on model but missing from an older database's table (nullable only)"""
+    table = model.__table__
+    bind = db.session.get_bind()
+    existing = {column['name'] for column in db.inspect(bind).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            column_type = column.type.compile(bind.dialect)
+            db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    db.session.commit()
 
-@app.route('/download_dashboard_pdf')
-def download_dashboard_pdf():
-    """Generate and download PDF report of current dashboard view"""
+def migrate_float_amounts():
+    """Move a database from before integer cents onto amount_cents.
+
+    add_missing_columns has already added the new columns; fill amount_cents from the old
+    float amount, drop the float columns (new rows never set them) and rebuild the rollups
+    from the exact values. Dropping columns needs SQLite 3.35+ or PostgreSQL.
+    """
+    bind = db.session.get_bind()
+    inspector = db.inspect(bind)
+    expense_columns = {column['name'] for column in inspector.get_columns('expense')}
+    rollup_columns = {column['name'] for column in inspector.get_columns('expense_rollup')}
+    if 'amount' not in expense_columns and 'total' not in rollup_columns:
+        return
+    
+    if 'amount' in expense_columns:
+        db.session.execute(text(
+            'UPDATE expense SET amount_cents = CAST(ROUND(amount * 100) AS BIGINT) WHERE amount_cents IS NULL'))
+        db.session.execute(text('ALTER TABLE expense DROP COLUMN amount'))
+    if 'total' in rollup_columns:
+        db.session.execute(text('ALTER TABLE expense_rollup DROP COLUMN total'))
+    if bind.dialect.name == 'postgresql':
+        db.session.execute(text('ALTER TABLE expense ALTER COLUMN amount_cents SET NOT NULL'))
+    db.session.commit()
+    rebuild_rollups()
+    print("Converted expense amounts to integer cents")
+
+def create_search_index():
+    """Create the full-text index on expense descriptions if it is missing.
+
+    SQLite gets an FTS5 table kept in sync by triggers (so bulk inserts are indexed too) and
+    filled once from the existing ledger; PostgreSQL gets a GIN index on the tsvector. Other
+    databases, and SQLite builds without FTS5, fall back to LIKE searches.
+    """
+    bind = db.session.get_bind()
+    dialect = bind.dialect.name
+    if dialect == 'postgresql':
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_expense_description_search "
+            "ON expense USING gin (to_tsvector('simple', description))"
+        ))
+        db.session.commit()
+        return
+    if dialect != 'sqlite' or db.inspect(bind).has_table('expense_fts'):
+        return
+    
     try:
-        # Get the same filter parameters as the main dashboard
-        date_filter = request.args.get('date', type=str)
-        date_from = request.args.get('date_from', type=str)
-        date_to = request.args.get('date_to', type=str)
-        category_filter = request.args.get('category', type=int)
-        selected_categories = request.args.getlist('categories', type=int)
-        date_toggle = request.args.get('date_toggle', type=str) == 'on'
-        date_range_mode = request.args.get('date_range_mode', type=str) == 'on'
-        category_toggle = request.args.get('category_toggle', type=str) == 'on'
-        
-        # Get dashboard statistics based on current filters (same logic as index route)
-        filtered_query = Expense.query
-        
-        # Apply category filter only if category toggle is ON
-        if category_toggle:
-            if selected_categories:
-                filtered_query = filtered_query.filter(Expense.category_id.in_(selected_categories))
-            elif category_filter:
-                filtered_query = filtered_query.filter(Expense.category_id == category_filter)
-        
-        # Apply date filter if toggle is ON
-        if date_toggle:
-            if date_range_mode and date_from and date_to:
-                try:
-                    from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-                    to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-                    filtered_query = filtered_query.filter(
-                        Expense.date >= from_date,
-                        Expense.date <= to_date
-                    )
-                except ValueError:
-                    pass
-            elif date_filter:
-                try:
-                    filter_date = datetime.strptime(date_filter, '%Y-%m-%d').date()
-                    filtered_query = filtered_query.filter(Expense.date == filter_date)
-                except ValueError:
-                    pass
-        
-        # Calculate filtered totals
-        total_spent = db.session.query(func.sum(Expense.amount)).filter(
-            Expense.id.in_(filtered_query.with_entities(Expense.id))
-        ).scalar() or 0
-        
-        # For monthly expenses, show filtered total or current month
-        if date_toggle and (date_filter or (date_range_mode and date_from and date_to)):
-            month_spent = total_spent
+        db.session.execute(text(
+            "CREATE VIRTUAL TABLE expense_fts USING fts5("
+            "description, content='expense', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+    except exc.OperationalError:
+        db.session.rollback()
+        return
+    db.session.execute(text(
+        "CREATE TRIGGER expense_fts_insert AFTER INSERT ON expense BEGIN "
+        "INSERT INTO expense_fts (rowid, description) VALUES (new.id, new.description); END"
+    ))
+    db.session.execute(text(
+        "CREATE TRIGGER expense_fts_delete AFTER DELETE ON expense BEGIN "
+        "INSERT INTO expense_fts (expense_fts, rowid, description) VALUES ('delete', old.id, old.description); END"
+    ))
+    db.session.execute(text(
+        "CREATE TRIGGER expense_fts_update AFTER UPDATE OF description ON expense BEGIN "
+        "INSERT INTO expense_fts (expense_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+        "INSERT INTO expense_fts (rowid, description) VALUES (new.id, new.description); END"
+    ))
+    db.session.execute(text("INSERT INTO expense_fts (expense_fts) VALUES ('rebuild')"))
+    db.session.commit()
+    current_app.extensions.pop('search_backend', None)
+
+def migrate_to_tenants():
+    """Move a database from before tenants onto them.
+
+    add_missing_columns has already added tenant_id: give existing rows to the bound (or
+    default) tenant, make category names unique per tenant instead of globally and drop the
+    listing indexes replaced by ones leading on tenant_id.
+    """
+    tenant_id = default_tenant_id()
+    for model in (Expense, Category, ExpenseRollup, MonthlySpend):
+        db.session.execute(text(f'UPDATE {model.__tablename__} SET tenant_id = :tenant_id WHERE tenant_id IS NULL'),
+                           {'tenant_id': tenant_id})
+    db.session.execute(text('DROP INDEX IF EXISTS ix_expense_date_id'))
+    db.session.execute(text('DROP INDEX IF EXISTS ix_expense_category_date'))
+    
+    bind = db.session.get_bind()
+    unique_name = next((constraint for constraint in db.inspect(bind).get_unique_constraints('category')
+                        if constraint['column_names'] == ['name']), None)
+    if unique_name is not None:
+        if bind.dialect.name == 'sqlite':
+            # SQLite cannot drop a constraint: copy the rows into a table created without it
+            columns = ', '.join(column.name for column in Category.__table__.columns)
+            Category.__table__.to_metadata(MetaData(), name='category_new').create(db.session.connection())
+            db.session.execute(text(f'INSERT INTO category_new ({columns}) SELECT {columns} FROM category'))
+            db.session.execute(text('DROP TABLE category'))
+            db.session.execute(text('ALTER TABLE category_new RENAME TO category'))
         else:
-            current_month = datetime.now().month
-            current_year = datetime.now().year
-            month_query = db.session.query(func.sum(Expense.amount)).filter(
-                extract('year', Expense.date) == current_year,
-                extract('month', Expense.date) == current_month
-            )
-            if category_toggle:
-                if selected_categories:
-                    month_query = month_query.filter(Expense.category_id.in_(selected_categories))
-                elif category_filter:
-                    month_query = month_query.filter(Expense.category_id == category_filter)
-            month_spent = month_query.scalar() or 0
-        
-        total_expenses = filtered_query.count()
+            db.session.execute(text(f'ALTER TABLE category DROP CONSTRAINT {unique_name["name"]}'))
+        print("Category names are now unique per tenant")
+    db.session.commit()
+
+def migrate_recurring_templates():
+    """Mark recurring templates on a database from before is_recurring_template.
+
+    Every monthly expense entered by hand or imported used to start its own series, so a
+    bill re-entered each month was generated several times over. Per tenant, description,
+    category and amount, the earliest one becomes the template and the later ones are linked
+    to it as occurrences; every other expense is marked as not a template.
+    """
+    db.session.execute(text('DROP INDEX IF EXISTS ix_expense_monthly'))
+    if db.session.query(Expense.id).filter(Expense.is_recurring_template.is_(None)).first() is None:
+        db.session.commit()
+        return
+    
+    series = {}
+    for row in db.session.query(
+        Expense.id, Expense.tenant_id, Expense.description, Expense.category_id, Expense.amount_cents, Expense.date
+    ).filter(
+        Expense.is_recurring_template.is_(None), Expense.is_monthly == True, Expense.recurring_source_id.is_(None)
+    ).order_by(Expense.date, Expense.id):
+        series.setdefault((row.tenant_id, row.description, row.category_id, row.amount_cents), []).append(row)
+    
+    # (template id, date) pairs already in a series; the unique occurrence index allows one of each
+    taken = set(db.session.query(Expense.recurring_source_id, Expense.date).filter(
+        Expense.recurring_source_id.isnot(None)).all())
+    links = []
+    for template, *entries in series.values():
+        for entry in entries:
+            if entry.date != template.date and (template.id, entry.date) not in taken:
+                taken.add((template.id, entry.date))
+                links.append({'expense_id': entry.id, 'source_id': template.id})
+    
+    table = Expense.__table__
+    if series:
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('template_id')).values(is_recurring_template=True),
+            [{'template_id': entries[0].id} for entries in series.values()])
+    if links:
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('expense_id')).values(
+                recurring_source_id=bindparam('source_id')),
+            links)
+    db.session.execute(table.update().where(table.c.is_recurring_template.is_(None)).values(
+        is_recurring_template=False))
+    db.session.commit()
+    print(f"Marked {len(series)} recurring templates and linked {len(links)} re-entered monthly expenses to them")
+
+def migrate_recurring_through():
+    """Set recurring_through on templates from before it was stored: their latest occurrence (or own date)"""
+    templates = db.session.query(Expense.id, Expense.date).filter(
+        Expense.is_recurring_template == True, Expense.recurring_through.is_(None)).all()
+    if not templates:
+        return
+    
+    latest = dict(db.session.query(Expense.recurring_source_id, func.max(Expense.date)).filter(
+        Expense.recurring_source_id.isnot(None)).group_by(Expense.recurring_source_id).all())
+    table = Expense.__table__
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('template_id')).values(recurring_through=bindparam('through')),
+        [{'template_id': template.id, 'through': max(latest.get(template.id, template.date), template.date)}
+         for template in templates])
+    db.session.commit()
+    print(f"Recorded how far {len(templates)} recurring templates have been materialized")
+
+def init_schema():
+    """Create the ledger tables and indexes in the session's database and migrate older ones"""
+    bind = db.session.get_bind()
+    db.metadata.create_all(bind, tables=[table for table in db.metadata.sorted_tables
+                                         if not table.info.get('registry', False)])
+    add_missing_columns(DataVersion)
+    add_missing_columns(Expense)
+    add_missing_columns(ExpenseRollup)
+    add_missing_columns(Category)
+    add_missing_columns(MonthlySpend)
+    migrate_to_tenants()
+    
+    # create_all skips tables that already exist, so add any indexes missing from older databases
+    for model in (Expense, Category, ExpenseRollup, MonthlySpend):
+        for index in model.__table__.indexes:
+            index.create(bind, checkfirst=True)
+    # Recurring series are grouped by amount, so older float amounts must be in cents first
+    migrate_float_amounts()
+    migrate_recurring_templates()
+    migrate_recurring_through()
+    create_search_index()
+    
+    # Databases created before the rollup or monthly spend tables existed need them backfilled once
+    if not ExpenseRollup.query.first() and Expense.query.first():
+        rebuild_rollups()
+    elif not MonthlySpend.query.first() and Expense.query.first():
+        reconcile_monthly_spend()
+
+def seed_tenant(tenant):
+    """Give the bound tenant its data version row and, if it has no categories, the default ones"""
+    if db.session.get(DataVersion, tenant.id) is None:
+        db.session.add(DataVersion(id=tenant.id, version=0, changed_at=datetime.utcnow()))
+        db.session.commit()
+    
+    if not Category.query.first():
+        default_categories = [
+            Category(name='Food & Dining', description='Restaurants, groceries, and food delivery'),
+            Category(name='Transportation', description='Gas, public transport, ride-sharing'),
+            Category(name='Shopping', description='Clothing, electronics, general shopping'),
+            Category(name='Bills & Utilities', description='Electricity, water, internet, phone bills'),
+            Category(name='Entertainment', description='Movies, games, subscriptions'),
+            Category(name='Healthcare', description='Medical expenses, pharmacy, insurance'),
+            Category(name='Travel', description='Hotels, flights, vacation expenses'),
+            Category(name='Education', description='Books, courses, educational materials'),
+            Category(name='Other', description='Miscellaneous expenses')
+        ]
         
-        # Get recent expenses with filtering
-        recent_query = Expense.query
+        for category in default_categories:
+            db.session.add(category)
         
-        # Apply date filter - only if toggle is ON
+        db.session.commit()
+        print(f"Tenant {tenant.slug} initialized with default categories!")
+
+def init_db():
+    """Create tables and indexes, migrate older databases and seed every tenant (needs an app context)"""
+    per_tenant_files = bool(current_app.config['TENANT_DATABASE_DIR'])
+    # The tenant registry always lives in the main database; so do the ledgers unless tenants have files
+    db.metadata.create_all(db.engine, tables=[Tenant.__table__])
+    if not per_tenant_files:
+        init_schema()
+    
+    # Created first, the default tenant gets id 1 (DEFAULT_TENANT_ID), which older rows were given
+    if not Tenant.query.filter_by(slug=DEFAULT_TENANT_SLUG).first():
+        db.session.add(Tenant(slug=DEFAULT_TENANT_SLUG, name='Default'))
+        db.session.commit()
+    
+    for tenant in db.session.query(Tenant.id, Tenant.slug).order_by(Tenant.id).all():
+        tenant = TenantRef(tenant.id, tenant.slug)
+        with tenant_context(tenant):
+            if per_tenant_files:
+                init_schema()
+            seed_tenant(tenant)
+
+def create_tenant(slug, name=None):
+    """Register a tenant and set up its ledger (in its own database file with TENANT_DATABASE_DIR).
+
+    Raises ValueError for an invalid or taken slug. Returns the new TenantRef.
+    """
+    if not valid_slug(slug):
+        raise ValueError('Tenant slugs are 1-63 lowercase letters, digits, "-" or "_"')
+    if Tenant.query.filter_by(slug=slug).first():
+        raise ValueError(f'Tenant {slug} already exists')
+    tenant = Tenant(slug=slug, name=name or slug)
+    db.session.add(tenant)
+    db.session.commit()
+    
+    tenant = TenantRef(tenant.id, tenant.slug)
+    with tenant_context(tenant):
+        if current_app.config['TENANT_DATABASE_DIR']:
+            init_schema()
+        seed_tenant(tenant)
+    return tenant
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create or migrate the database schema and seed default categories."""
+    init_db()
+
+@click.command('create-tenant')
+@click.argument('slug')
+@click.option('--name', help='Display name (defaults to the slug).')
+@with_appcontext
+def create_tenant_command(slug, name):
+    """Add a tenant (a separate ledger) with the default categories."""
+    try:
+        tenant = create_tenant(slug, name)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"Created tenant {tenant.slug} (id {tenant.id})")
+
+@click.command('materialize-recurring')
+@with_appcontext
+def materialize_recurring_command():
+    """Create this month's (and any missed months') occurrences of monthly expenses."""
+    inserted = sum(materialize_recurring() for _ in each_tenant_database())
+    print(f"Created {inserted} recurring expense occurrences")
+
+@click.command('reconcile-budgets')
+@with_appcontext
+def reconcile_budgets_command():
+    """Rebuild the monthly budget spend counters from the ledger, reporting any that drifted."""
+    total = 0
+    for tenant in each_tenant_database():
+        corrected = reconcile_monthly_spend()
+        for month, category_id, counter_cents, ledger_cents in corrected:
+            print(f"{tenant.slug + ' ' if tenant else ''}{month.strftime('%Y-%m')} category {category_id}: "
+                  f"counter {format_cents(counter_cents)}, ledger {format_cents(ledger_cents)}")
+        total += len(corrected)
+    print(f"{total} monthly spend counters corrected")
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Recompute the daily rollup table from the expense ledger."""
+    for _ in each_tenant_database():
+        rebuild_rollups()
+    print("Rollup table rebuilt!")
+
+@timed_stage('pdf_dashboard')
+def build_dashboard_pdf(args, progress=None):
+    """Render the dashboard PDF for the given query parameters and return its bytes.
+
+    progress, if given, is called with (percent, message) as rendering advances.
+    """
+    progress = progress or (lambda percent, message=None: None)
+    # Get the same filter parameters as the main dashboard
+    date_filter = args.get('date', type=str)
+    date_from = args.get('date_from', type=str)
+    date_to = args.get('date_to', type=str)
+    category_filter = args.get('category', type=int)
+    selected_categories = args.getlist('categories', type=int)
+    date_toggle = args.get('date_toggle', type=str) == 'on'
+    date_range_mode = args.get('date_range_mode', type=str) == 'on'
+    category_toggle = args.get('category_toggle', type=str) == 'on'
+    
+    expense_filter = ExpenseFilter.from_dashboard_args(args)
+    
+    # Get dashboard statistics based on current filters (same logic as index route)
+    stats = dashboard_stats(expense_filter)
+    
+    # Get recent expenses with filtering
+    recent_query = expense_listing_query().filter(expense_filter.clause())
+    recent_expenses = recent_query.order_by(Expense.date.desc(), Expense.id.desc()).limit(10).all()
+    
+    # Get all categories for filter display
+    categories = Category.query.all()
+    progress(40, 'Data loaded')
+    
+    # Filter Information: ReportLab markup, so values taken from the request or the user are escaped
+    filter_text = None
+    if date_toggle or category_toggle:
+        filter_text = "🔍 Applied Filters:<br/>"
         if date_toggle:
             if date_range_mode and date_from and date_to:
-                try:
-                    from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-                    to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-                    recent_query = recent_query.filter(
-                        Expense.date >= from_date,
-                        Expense.date <= to_date
-                    )
-                except ValueError:
-                    pass
+                filter_text += f"<b>Date Range:</b> {escape(date_from)} to {escape(date_to)}<br/>"
             elif date_filter:
-                try:
-                    filter_date = datetime.strptime(date_filter, '%Y-%m-%d').date()
-                    recent_query = recent_query.filter(Expense.date == filter_date)
-                except ValueError:
-                    pass
-        
-        # Apply category filter only if category toggle is ON
+                filter_text += f"<b>Date:</b> {escape(date_filter)}<br/>"
         if category_toggle:
             if selected_categories:
-                recent_query = recent_query.filter(Expense.category_id.in_(selected_categories))
+                filter_text += f"<b>Categories:</b> {len(selected_categories)} categories selected<br/>"
             elif category_filter:
-                recent_query = recent_query.filter(Expense.category_id == category_filter)
-        
-        recent_expenses = recent_query.order_by(Expense.date.desc()).limit(10).all()
-        
-        # Get all categories for filter display
-        categories = Category.query.all()
-        
-        # Create PDF using ReportLab
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
-        
-        # Get styles
-        styles = getSampleStyleSheet()
-        
-        # Create custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#007bff'),
-            alignment=TA_CENTER,
-            spaceAfter=20
-        )
+                category_name = next((cat.name for cat in categories if cat.id == category_filter), 'Unknown')
+                filter_text += f"<b>Category:</b> {escape(category_name)}<br/>"
+    
+    # ReportLab is only loaded once a PDF is actually requested
+    from pdf_reports import render_dashboard_pdf
+    return render_dashboard_pdf(stats, recent_expenses, categories, filter_text, progress)
+
+@timed_stage('pdf_ledger')
+def build_ledger_pdf(args, progress=None):
+    """Render every expense matching the dashboard filters as a paginated statement.
+
+    Rows are streamed from the database in batches straight into the renderer.
+    """
+    expense_filter = ExpenseFilter.from_dashboard_args(args)
+    stats = dashboard_stats(expense_filter)
+    category_names = dict(db.session.query(Category.id, Category.name).all())
+    
+    rows = db.session.query(
+        Expense.date, Expense.description, Category.name, Expense.amount_cents, Expense.is_monthly
+    ).join(Category, Expense.category_id == Category.id).filter(
+        expense_filter.clause()
+    ).order_by(Expense.date, Expense.id).yield_per(LEDGER_FETCH_SIZE)
+    
+    if expense_filter.category_ids:
+        scope = ', '.join(category_names.get(category_id, 'Unknown') for category_id in expense_filter.category_ids)
+    else:
+        scope = 'All categories'
+    if expense_filter.is_date_filtered:
+        scope += f" | {expense_filter.from_date or '...'} to {expense_filter.to_date or '...'}"
+    
+    from pdf_reports import render_ledger_pdf
+    return render_ledger_pdf(rows, stats, scope, progress)
+
+@bp.route('/download_dashboard_pdf')
+def download_dashboard_pdf():
+    """Generate and download PDF report of current dashboard view"""
+    try:
+        # Skip rendering entirely when the client already has this report
+        etag, last_modified, not_modified = conditional_headers(
+            request.path, normalized_args(request.args), as_of=date.today())
+        if not_modified:
+            return not_modified_response(etag, last_modified)
         
-        subtitle_style = ParagraphStyle(
-            'CustomSubtitle',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#007bff'),
-            alignment=TA_LEFT,
-            spaceAfter=12
+        # Identical filters share one rendered report until the data changes
+        pdf_content = response_cache.get_or_set(
+            versioned_cache_key('pdf', normalized_args(request.args)),
+            lambda: build_dashboard_pdf(request.args)
         )
         
-        # Build PDF content
-        story = []
-        
-        # Title
-        story.append(Paragraph("📊 Personal Expense Tracker - Dashboard Report", title_style))
-        story.append(Paragraph(f"Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal']))
-        story.append(Spacer(1, 20))
-        
-        # Filter Information
-        if date_toggle or category_toggle:
-            filter_text = "🔍 Applied Filters:<br/>"
-            if date_toggle:
-                if date_range_mode and date_from and date_to:
-                    filter_text += f"<b>Date Range:</b> {date_from} to {date_to}<br/>"
-                elif date_filter:
-                    filter_text += f"<b>Date:</b> {date_filter}<br/>"
-            if category_toggle:
-                if selected_categories:
-                    filter_text += f"<b>Categories:</b> {len(selected_categories)} categories selected<br/>"
-                elif selected_category:
-                    category_name = next((cat.name for cat in categories if cat.id == category_filter), 'Unknown')
-                    filter_text += f"<b>Category:</b> {category_name}<br/>"
-            if not date_toggle and not category_toggle:
-                filter_text += "<b>No filters applied</b> - Showing all expenses<br/>"
-            
-            story.append(Paragraph(filter_text, styles['Normal']))
-            story.append(Spacer(1, 15))
-        
-        # Dashboard Statistics
-        story.append(Paragraph("Dashboard Statistics", subtitle_style))
-        
-        # Create stats table
-        stats_data = [
-            ['Metric', 'Value', 'Description'],
-            ['Total Spent', f'${total_spent:.2f}', 'Total amount spent'],
-            ['Monthly/Date Range', f'${month_spent:.2f}', 'Monthly or filtered total'],
-            ['Total Expenses', str(total_expenses), 'Number of transactions']
-        ]
-        
-        stats_table = Table(stats_data, colWidths=[2*inch, 1.5*inch, 2.5*inch])
-        stats_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007bff')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(stats_table)
-        story.append(Spacer(1, 20))
-        
-        # Recent Expenses
-        story.append(Paragraph("Recent Expenses", subtitle_style))
-        
-        if recent_expenses:
-            # Create expenses table
-            expenses_data = [['Date', 'Description', 'Category', 'Amount', 'Type']]
-            for expense in recent_expenses:
-                expense_type = 'Monthly' if expense.is_monthly else 'One-time'
-                expenses_data.append([
-                    expense.date.strftime('%Y-%m-%d'),
-                    expense.description,
-                    expense.category.name,
-                    f'${expense.amount:.2f}',
-                    expense_type
-                ])
-            
-            expenses_table = Table(expenses_data, colWidths=[1*inch, 2.5*inch, 1*inch, 1*inch, 0.8*inch])
-            expenses_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007bff')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-            ]))
-            
-            story.append(expenses_table)
-        else:
-            story.append(Paragraph("No expenses found matching the current filters.", styles['Normal']))
-        
-        story.append(Spacer(1, 20))
-        
-        # Summary
-        story.append(Paragraph("Summary", subtitle_style))
-        summary_data = [
-            ['Metric', 'Value'],
-            ['Total Transactions', str(total_expenses)],
-            ['Average per Expense', f'${(total_spent / total_expenses):.2f}' if total_expenses > 0 else '$0.00'],
-            ['Available Categories', str(len(categories))]
-        ]
-        
-        summary_table = Table(summary_data, colWidths=[2.5*inch, 1.5*inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#28a745')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(summary_table)
-        
-        # Footer
-        story.append(Spacer(1, 30))
-        story.append(Paragraph("This report was generated by Personal Expense Tracker", styles['Normal']))
-        story.append(Paragraph("Report includes all data based on applied filters at the time of generation", styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
-        
-        # Get PDF content
-        pdf_content = buffer.getvalue()
-        buffer.close()
-        
         # Create filename with timestamp
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'expense_dashboard_report_{timestamp}.pdf'
         
         # Return PDF as download
-        return Response(
+        response = Response(
             pdf_content,
             mimetype='application/pdf',
             headers={
@@ -664,13 +2219,95 @@ def download_dashboard_pdf():
                 'Content-Type': 'application/pdf'
             }
         )
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return response
+        
+    except Exception as e:
+        flash(f'Error generating PDF: {str(e)}', 'error')
+        return redirect(url_for('main.index'))
+
+@bp.route('/download_ledger_pdf')
+def download_ledger_pdf():
+    """Download every expense matching the dashboard filters as a PDF statement"""
+    try:
+        etag, last_modified, not_modified = conditional_headers(
+            request.path, normalized_args(request.args), as_of=date.today())
+        if not_modified:
+            return not_modified_response(etag, last_modified)
+        
+        pdf_content = build_ledger_pdf(request.args)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        response = Response(
+            pdf_content,
+            mimetype='application/pdf',
+            headers={'Content-Disposition': f'attachment; filename=expense_ledger_{timestamp}.pdf'}
+        )
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return response
         
     except Exception as e:
         flash(f'Error generating PDF: {str(e)}', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
+
+@bp.route('/pdf_jobs', methods=['POST'])
+def create_pdf_job():
+    """Queue a PDF for background rendering (same filter parameters as the dashboard).
+
+    report=ledger renders the full statement instead of the dashboard summary.
+    """
+    args = request.values.copy()
+    build = build_ledger_pdf if args.get('report') == 'ledger' else build_dashboard_pdf
+    
+    app = current_app._get_current_object()
+    tenant = g.tenant
+    
+    def render(progress):
+        with app.app_context():
+            use_tenant(tenant)
+            return build(args, progress)
+    
+    try:
+        job_id = pdf_jobs.submit(render, owner=tenant.slug)
+    except QueueFullError:
+        return jsonify({'error': 'Too many PDF reports are being generated, try again shortly'}), 503
+    
+    return jsonify({
+        'job_id': job_id,
+        'status_url': url_for('main.pdf_job_status', job_id=job_id),
+        'download_url': url_for('main.download_pdf_job', job_id=job_id)
+    }), 202
+
+@bp.route('/pdf_jobs/<job_id>')
+def pdf_job_status(job_id):
+    # Another tenant's job is reported as unknown, not as forbidden
+    state = pdf_jobs.status(job_id, owner=g.tenant.slug)
+    if state is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(state)
+
+@bp.route('/pdf_jobs/<job_id>/download')
+def download_pdf_job(job_id):
+    state = pdf_jobs.status(job_id, owner=g.tenant.slug)
+    if state is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if state['status'] != 'done':
+        return jsonify(state), 409
+    
+    timestamp = datetime.fromtimestamp(state['updated_at']).strftime('%Y%m%d_%H%M%S')
+    return send_file(
+        pdf_jobs.pdf_path(job_id, owner=g.tenant.slug),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=f'expense_dashboard_report_{timestamp}.pdf'
+    )
 
 if __name__ == '__main__':
-    init_db()
+    # Development server; production runs wsgi:app under gunicorn (see gunicorn.conf.py)
+    app = create_app()
+    with app.app_context():
+        init_db()
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
     app.run(debug=debug, host='0.0.0.0', port=port)
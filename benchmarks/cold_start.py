@@ -0,0 +1,83 @@
+"""Cold-start cost: importing app, building the application and serving the first request.
+
+Each run is a fresh interpreter against a new SQLite file. Also checks that the PDF
+stack (ReportLab) is not loaded until a report is actually rendered.
+
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --runs 20 --budget 400
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_single():
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['PDF_JOB_DIR'] = os.path.join(workdir, 'pdf_jobs')
+    sys.path.insert(0, ROOT)
+
+    started = time.perf_counter()
+    import app as expense_app
+    imported = time.perf_counter()
+    flask_app = expense_app.create_app()
+    created = time.perf_counter()
+    with flask_app.app_context():
+        expense_app.init_db()
+    client = flask_app.test_client()
+    ready = time.perf_counter()
+    response = client.get('/')
+    served = time.perf_counter()
+    assert response.status_code == 200, response.status_code
+    reportlab_after_request = 'reportlab' in sys.modules
+
+    response = client.get('/download_dashboard_pdf')
+    assert response.status_code == 200, response.status_code
+    rendered = time.perf_counter()
+
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_request_ms': (served - ready) * 1000,
+        'first_pdf_ms': (rendered - served) * 1000,
+        'reportlab_loaded_before_pdf': reportlab_after_request
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget', type=float, help='fail if the median import time exceeds this many ms')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single()
+        return
+
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, __file__, '--single'],
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    summary = {key: round(statistics.median(result[key] for result in results), 1)
+               for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'first_pdf_ms')}
+    summary['reportlab_loaded_before_pdf'] = any(result['reportlab_loaded_before_pdf'] for result in results)
+    print(json.dumps(summary, indent=2))
+
+    if summary['reportlab_loaded_before_pdf']:
+        sys.exit('ReportLab was imported before any PDF was requested')
+    if args.budget is not None and summary['import_ms'] > args.budget:
+        sys.exit(f"import app took {summary['import_ms']}ms, over the {args.budget}ms budget")
+
+
+if __name__ == '__main__':
+    main()
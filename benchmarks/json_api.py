@@ -0,0 +1,134 @@
+"""/api/expenses serialization: ORM objects + to_dict against row tuples + batched encoding.
+
+For each ledger size a fresh subprocess seeds a temporary SQLite database and times the
+full streamed listing and a 1000-row page through the test client:
+
+- orm_to_dict: the previous path (an Expense object and to_dict per row, json.dumps per
+  row when streaming, jsonify for a page), served from a benchmark-only route
+- rows_json / rows_orjson: the row-tuple path with the json module / orjson (when installed)
+- rows_orjson_3_fields: the same with ?fields=id,amount,date
+
+    python benchmarks/json_api.py
+    python benchmarks/json_api.py --rows 1000000 --requests 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [10000, 100000]
+PAGE_SIZE = 1000
+
+
+def add_legacy_routes(expense_app, flask_app):
+    """The listing as it was served before the row-tuple path, for comparison"""
+    from flask import Response, jsonify, request, stream_with_context
+
+    def legacy_expenses():
+        expense_app.use_tenant(expense_app.find_tenant(expense_app.DEFAULT_TENANT_SLUG))
+        query = expense_app.expense_listing_query().order_by(
+            expense_app.Expense.date.desc(), expense_app.Expense.id.desc())
+        limit = request.args.get('limit', type=int)
+        if limit:
+            expenses, more = expense_app.keyset_page(query, limit)
+            return jsonify({
+                'expenses': [expense.to_dict() for expense in expenses],
+                'next_cursor': expense_app.encode_cursor(expenses[-1].date, expenses[-1].id) if more else None
+            })
+
+        def generate():
+            yield '['
+            chunk = []
+            for i, expense in enumerate(query.yield_per(expense_app.API_STREAM_CHUNK)):
+                chunk.append((',' if i else '') + json.dumps(expense.to_dict()))
+                if len(chunk) >= expense_app.API_STREAM_CHUNK:
+                    yield ''.join(chunk)
+                    chunk = []
+            chunk.append(']')
+            yield ''.join(chunk)
+        return Response(stream_with_context(generate()), mimetype='application/json')
+
+    flask_app.add_url_rule('/legacy/api/expenses', 'legacy_expenses', legacy_expenses)
+
+
+def run_single(rows, requests):
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['CACHE_BACKEND'] = 'none'
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as expense_app
+    import serialization
+    from synthetic import seed_ledger
+
+    flask_app = expense_app.create_app()
+    add_legacy_routes(expense_app, flask_app)
+    with flask_app.app_context():
+        expense_app.init_db()
+        seed_ledger(expense_app, rows)
+
+    orjson = serialization.orjson
+    modes = [('orm_to_dict', '/legacy/api/expenses', None), ('rows_json', '/api/expenses', None)]
+    if orjson is not None:
+        modes += [('rows_orjson', '/api/expenses', orjson),
+                  ('rows_orjson_3_fields', '/api/expenses?fields=id,amount,date', orjson)]
+
+    client = flask_app.test_client()
+    results = []
+    for mode, url, encoder in modes:
+        serialization.orjson = encoder
+        for shape, suffix in (('stream', ''), ('page', f'limit={PAGE_SIZE}')):
+            full_url = url + ('&' if '?' in url else '?') + suffix if suffix else url
+            samples = []
+            for _ in range(requests + 1):
+                started = time.perf_counter()
+                response = client.get(full_url)
+                body = response.get_data()
+                samples.append(time.perf_counter() - started)
+                assert response.status_code == 200, (full_url, response.status_code)
+            # The first request warms the page cache and imports
+            samples = samples[1:]
+            results.append({
+                'mode': mode,
+                'shape': shape,
+                'response_bytes': len(body),
+                'p50_ms': round(statistics.median(samples) * 1000, 2),
+                'rows_per_second': round((rows if shape == 'stream' else PAGE_SIZE) / statistics.median(samples))
+            })
+    serialization.orjson = orjson
+
+    baseline = {result['shape']: result['p50_ms'] for result in results if result['mode'] == 'orm_to_dict'}
+    for result in results:
+        result['speedup'] = round(baseline[result['shape']] / result['p50_ms'], 2)
+    return {'rows': rows, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, action='append', help='ledger size (repeatable)')
+    parser.add_argument('--requests', type=int, default=5, help='measured requests per mode')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.rows[0], args.requests)))
+        return
+
+    runs = []
+    for rows in args.rows or DEFAULT_SIZES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--single', '--rows', str(rows),
+             '--requests', str(args.requests)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps(runs, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Render time and peak memory of the full-ledger PDF export.
+
+Each size runs in a fresh subprocess against its own temporary SQLite database, so
+the peak RSS reported for one size is not inflated by the previous one.
+
+    python benchmarks/ledger_pdf.py                # 1k, 10k and 100k rows
+    python benchmarks/ledger_pdf.py --rows 5000    # a single size
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_single(rows):
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['CACHE_BACKEND'] = 'none'
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as expense_app
+    from synthetic import seed_ledger
+
+    flask_app = expense_app.create_app()
+    with flask_app.app_context():
+        expense_app.init_db()
+        seed_ledger(expense_app, rows)
+
+    rss_before = peak_rss_mb()
+    with flask_app.test_request_context('/download_ledger_pdf'):
+        started = time.perf_counter()
+        pdf_content = expense_app.build_ledger_pdf(expense_app.request.args)
+        elapsed = time.perf_counter() - started
+
+    return {
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed),
+        'pdf_bytes': len(pdf_content),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_rss_before_render_mb': round(rss_before, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, action='append', help='ledger size (repeatable)')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.rows[0])))
+        return
+
+    for rows in args.rows or DEFAULT_SIZES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--single', '--rows', str(rows)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        print(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Reports analytics: the NumPy engine (analytics.py) against one SQL query per metric.
+
+Both sides compute the same figures over the whole ledger: a category x month pivot,
+monthly totals and month-over-month change, 30/90-day rolling daily averages, overall and
+per-category percentiles and the ten largest expenses. The engine is timed cold (cache
+miss: loading the arrays plus the computation) and warm (served from the per-data-version
+cache). Each ledger size runs in a fresh subprocess with its own temporary SQLite database.
+
+    python benchmarks/reports_analytics.py                     # 1M rows
+    python benchmarks/reports_analytics.py --rows 100000 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [1000000]
+
+
+def per_query_analytics(expense_app):
+    """The same figures the way reports() used to get its summaries: a query per metric"""
+    db = expense_app.db
+    Expense = expense_app.Expense
+    func = db.func
+    year = expense_app.extract('year', Expense.date)
+    month = expense_app.extract('month', Expense.date)
+
+    pivot = db.session.query(Expense.category_id, year, month, func.sum(Expense.amount_cents)).group_by(
+        Expense.category_id, year, month).all()
+    month_totals = db.session.query(year, month, func.sum(Expense.amount_cents)).group_by(
+        year, month).order_by(year, month).all()
+    deltas = [current[2] - previous[2] for previous, current in zip(month_totals, month_totals[1:])]
+
+    # Rolling averages from daily totals, summed in Python
+    daily = dict(db.session.query(Expense.date, func.sum(Expense.amount_cents)).group_by(Expense.date).all())
+    rolling = {}
+    if daily:
+        first, today = min(daily), date.today()
+        for window in (30, 90):
+            rolling[window] = [
+                sum(daily.get(day_end - timedelta(days=i), 0) for i in range(window)) / window
+                for day_end in (first + timedelta(days=n) for n in range(0, (today - first).days + 1, 30))
+            ]
+
+    # Percentiles by seeking to the rank in amount order, once per category and percentile
+    percentiles = {}
+    counts = dict(db.session.query(Expense.category_id, func.count()).group_by(Expense.category_id).all())
+    counts[None] = sum(counts.values())
+    for category_id, count in counts.items():
+        query = db.session.query(Expense.amount_cents)
+        if category_id is not None:
+            query = query.filter(Expense.category_id == category_id)
+        percentiles[category_id] = [
+            query.order_by(Expense.amount_cents).offset(min(count - 1, count * p // 100)).limit(1).scalar()
+            for p in (50, 75, 90, 95, 99)
+        ]
+
+    top = db.session.query(Expense.id).order_by(Expense.amount_cents.desc()).limit(10).all()
+    return {
+        'pivot_total': sum(row[3] for row in pivot) / 100,
+        'months': len(month_totals),
+        'deltas': len(deltas),
+        'percentiles': percentiles[None],
+        'top': [row.id for row in top]
+    }
+
+
+def timed_runs(function, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - started)
+    return result, round(statistics.median(samples) * 1000, 2)
+
+
+def run_single(rows, runs):
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['CACHE_BACKEND'] = 'memory'
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as expense_app
+    from synthetic import seed_ledger
+
+    flask_app = expense_app.create_app()
+    cache = flask_app.extensions['response_cache']
+    with flask_app.app_context():
+        expense_app.init_db()
+        seed_seconds = seed_ledger(expense_app, rows)
+        expense_filter = expense_app.ExpenseFilter()
+
+        sql_result, sql_ms = timed_runs(lambda: per_query_analytics(expense_app), runs)
+
+        def cold():
+            cache.backend.clear()
+            return expense_app.reports_analytics(expense_filter)
+        engine_result, cold_ms = timed_runs(cold, runs)
+        _, warm_ms = timed_runs(lambda: expense_app.reports_analytics(expense_filter), runs)
+
+    pivot_total = sum(map(sum, engine_result['pivot']))
+    assert round(pivot_total, 2) == round(sql_result['pivot_total'], 2), (pivot_total, sql_result['pivot_total'])
+    assert [expense['id'] for expense in engine_result['top_expenses']][:1] == sql_result['top'][:1]
+
+    return {
+        'rows': rows,
+        'seed_seconds': round(seed_seconds, 2),
+        'per_query_ms': sql_ms,
+        'engine_cold_ms': cold_ms,
+        'engine_warm_ms': warm_ms,
+        'speedup_cold': round(sql_ms / cold_ms, 1) if cold_ms else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, action='append', help='ledger size (repeatable)')
+    parser.add_argument('--runs', type=int, default=3, help='timed runs per approach (median reported)')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.rows[0], args.runs)))
+        return
+
+    results = []
+    for rows in args.rows or DEFAULT_SIZES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--single', '--rows', str(rows), '--runs', str(args.runs)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Latency and memory of every read route against synthetic ledgers.
+
+Each ledger size runs in a fresh subprocess with its own temporary SQLite database
+(seeded by synthetic.py) and the response cache disabled, so every request does the
+full work. Memory per route is the peak of Python allocations (tracemalloc) during one
+extra request after the timed ones, so tracing doesn't slow the timings; allocations made
+inside SQLite itself are not seen. Results are JSON; save a run with --output and pass it
+to --compare later to see the change per route.
+
+    python benchmarks/routes.py                          # 10k and 100k rows
+    python benchmarks/routes.py --rows 1000000 --requests 10 --output before.json
+    python benchmarks/routes.py --rows 1000000 --requests 10 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [10000, 100000]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def request_peak_mb(client, url):
+    """Peak traced allocations while serving one request, in MB"""
+    tracemalloc.start()
+    try:
+        client.get(url).get_data()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def route_plan(expense_app, rows):
+    """(name, url, heavy) for every route measured; heavy routes get fewer repetitions"""
+    db = expense_app.db
+    Expense = expense_app.Expense
+    top_category = db.session.query(Expense.category_id).group_by(Expense.category_id).order_by(
+        db.func.count().desc()).limit(1).scalar()
+    today = date.today()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    year_ago = (today - timedelta(days=365)).isoformat()
+    middle = db.session.query(Expense.date, Expense.id).order_by(
+        Expense.date.desc(), Expense.id.desc()).offset(rows // 2).limit(1).first()
+    last_page = max(1, (rows + 9) // 10)
+
+    return [
+        ('dashboard', '/', False),
+        ('dashboard_category', f'/?category_toggle=on&category={top_category}', False),
+        ('dashboard_date_range',
+         f'/?date_toggle=on&date_range_mode=on&date_from={year_ago}&date_to={today.isoformat()}', False),
+        ('expenses_newest', '/expenses', False),
+        ('expenses_cursor_middle', f'/expenses?after={expense_app.encode_cursor(middle.date, middle.id)}', False),
+        ('expenses_page_1', '/expenses?page=1', False),
+        ('expenses_page_middle', f'/expenses?page={last_page // 2 or 1}', False),
+        ('expenses_page_last', f'/expenses?page={last_page}', False),
+        ('reports', '/reports', False),
+        ('api_first_page', '/api/expenses?limit=100', False),
+        ('api_category', f'/api/expenses?limit=100&category={top_category}', False),
+        ('api_date_range', f'/api/expenses?limit=100&date_from={month_ago}&date_to={today.isoformat()}', False),
+        ('api_category_date_range',
+         f'/api/expenses?limit=100&category={top_category}&date_from={year_ago}&date_to={today.isoformat()}', False),
+        ('api_deep_cursor',
+         f'/api/expenses?limit=100&cursor={expense_app.encode_cursor(middle.date, middle.id)}', False),
+        ('api_full_stream', '/api/expenses', True),
+        ('dashboard_pdf', '/download_dashboard_pdf', True)
+    ]
+
+
+def run_single(rows, requests):
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['CACHE_BACKEND'] = 'none'
+    os.environ['PDF_JOB_DIR'] = os.path.join(workdir, 'pdf_jobs')
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as expense_app
+    from synthetic import seed_ledger
+
+    flask_app = expense_app.create_app()
+    with flask_app.app_context():
+        expense_app.init_db()
+        seed_seconds = seed_ledger(expense_app, rows)
+        plan = route_plan(expense_app, rows)
+
+    client = flask_app.test_client()
+    results = []
+    for name, url, heavy in plan:
+        # One unmeasured request first, so imports and template compilation are not counted
+        client.get(url).get_data()
+        samples = []
+        for _ in range(max(1, requests // 5) if heavy else requests):
+            started = time.perf_counter()
+            response = client.get(url)
+            size = len(response.get_data())
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 200, (url, response.status_code)
+        results.append({
+            'route': name,
+            'url': url,
+            'requests': len(samples),
+            'response_bytes': size,
+            'p50_ms': round(statistics.median(samples) * 1000, 2),
+            'p90_ms': round(percentile(samples, 0.9) * 1000, 2),
+            'p99_ms': round(percentile(samples, 0.99) * 1000, 2),
+            'max_ms': round(max(samples) * 1000, 2),
+            'peak_alloc_mb': round(request_peak_mb(client, url), 2)
+        })
+
+    return {
+        'rows': rows,
+        'seed_seconds': round(seed_seconds, 2),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        # The whole process, seeding included
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'routes': results
+    }
+
+
+def print_comparison(baseline, runs):
+    previous = {(run['rows'], route['route']): route for run in baseline for route in run['routes']}
+    print(f"{'rows':>9}  {'route':<26} {'before p50':>11} {'after p50':>10} {'change':>8} "
+          f"{'before mem':>11} {'after mem':>10}")
+    for run in runs:
+        for route in run['routes']:
+            before = previous.get((run['rows'], route['route']))
+            if before is None:
+                continue
+            change = (route['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            before_mem = f"{before['peak_alloc_mb']:.2f}MB" if 'peak_alloc_mb' in before else '-'
+            print(f"{run['rows']:>9}  {route['route']:<26} {before['p50_ms']:>9.2f}ms "
+                  f"{route['p50_ms']:>8.2f}ms {change:>+7.1f}% {before_mem:>11} {route['peak_alloc_mb']:>8.2f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, action='append', help='ledger size (repeatable)')
+    parser.add_argument('--requests', type=int, default=20, help='measured requests per route')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier --output run')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.rows[0], args.requests)))
+        return
+
+    runs = []
+    for rows in args.rows or DEFAULT_SIZES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--single', '--rows', str(rows),
+             '--requests', str(args.requests)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(json.dumps(runs, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(runs, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Concurrent read/write throughput on SQLite with and without the connection tuning.
+
+Reader threads poll /api/expenses pages while writer threads add expenses through
+/add_expense, all against one database file. Each mode runs in its own subprocess
+(SQLITE_TUNE=0 is the stock rollback journal with synchronous=FULL).
+
+    python benchmarks/sqlite_concurrency.py
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 2 --seconds 10
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_single(readers, writers, seconds, seed_rows):
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['CACHE_BACKEND'] = 'none'
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as expense_app
+    from synthetic import seed_ledger
+
+    flask_app = expense_app.create_app()
+    with flask_app.app_context():
+        expense_app.init_db()
+        seed_ledger(expense_app, seed_rows)
+
+    stop = threading.Event()
+    latencies = {'read': [], 'write': []}
+    errors = []
+
+    def reader():
+        client = flask_app.test_client()
+        rng = random.Random()
+        while not stop.is_set():
+            category = rng.randint(1, 9)
+            started = time.perf_counter()
+            response = client.get(f'/api/expenses?limit=50&category={category}')
+            response.get_data()
+            latencies['read'].append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    def writer():
+        client = flask_app.test_client()
+        rng = random.Random()
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post('/add_expense', data={
+                'amount': f'{rng.uniform(1, 100):.2f}',
+                'description': 'Benchmark write',
+                'date': date.today().isoformat(),
+                'category_id': str(rng.randint(1, 9))
+            })
+            latencies['write'].append(time.perf_counter() - started)
+            if response.status_code != 302:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    result = {'tuned': flask_app.config['SQLITE_TUNE'], 'readers': readers, 'writers': writers, 'errors': len(errors)}
+    for kind, samples in latencies.items():
+        result[f'{kind}s_per_second'] = round(len(samples) / seconds, 1)
+        result[f'{kind}_p50_ms'] = round(statistics.median(samples) * 1000, 2) if samples else None
+        result[f'{kind}_p95_ms'] = round(percentile(samples, 0.95) * 1000, 2) if samples else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--seed-rows', type=int, default=20000)
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.readers, args.writers, args.seconds, args.seed_rows)))
+        return
+
+    for tune in ('0', '1'):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--single',
+             '--readers', str(args.readers), '--writers', str(args.writers),
+             '--seconds', str(args.seconds), '--seed-rows', str(args.seed_rows)],
+            check=True, capture_output=True, text=True, env={**os.environ, 'SQLITE_TUNE': tune}
+        ).stdout
+        print(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    main()
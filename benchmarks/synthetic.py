@@ -0,0 +1,147 @@
+"""Deterministic synthetic ledgers for benchmarks.
+
+Spending is skewed the way real ledgers are: a few categories (food, transport,
+shopping) hold most transactions, activity grows towards the present and peaks on
+weekends, amounts are log-normal per category, and about 8% of rows are monthly bills
+(rent, subscriptions) repeated on a fixed day of the month.
+
+Import seed_ledger() from a benchmark, or seed a database directly:
+
+    DATABASE_URL=sqlite:///expenses.db python benchmarks/synthetic.py --rows 100000
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INSERT_BATCH_SIZE = 10000
+
+# Default category name -> (share of one-time transactions, median amount, merchants)
+CATEGORY_PROFILES = {
+    'Food & Dining': (0.34, 18, ['Grocery store', 'Coffee shop', 'Pizza delivery', 'Lunch', 'Bakery']),
+    'Transportation': (0.18, 22, ['Fuel', 'Metro card', 'Ride share', 'Parking', 'Car wash']),
+    'Shopping': (0.15, 45, ['Online order', 'Clothing', 'Electronics', 'Hardware store']),
+    'Entertainment': (0.09, 25, ['Cinema', 'Concert tickets', 'Video game', 'Bowling']),
+    'Bills & Utilities': (0.07, 80, ['Electricity', 'Water bill', 'Phone top-up']),
+    'Healthcare': (0.06, 40, ['Pharmacy', 'Dentist', 'Doctor visit']),
+    'Other': (0.05, 30, ['Gift', 'Donation', 'Haircut', 'Post office']),
+    'Travel': (0.04, 180, ['Hotel', 'Flight', 'Train ticket', 'Car rental']),
+    'Education': (0.02, 60, ['Books', 'Online course', 'Workshop'])
+}
+
+# Recurring bills: (description, category name, amount in cents)
+MONTHLY_BILLS = [
+    ('Rent', 'Bills & Utilities', 145000),
+    ('Internet', 'Bills & Utilities', 5999),
+    ('Mobile plan', 'Bills & Utilities', 3500),
+    ('Streaming subscription', 'Entertainment', 1549),
+    ('Music subscription', 'Entertainment', 1099),
+    ('Gym membership', 'Healthcare', 4200),
+    ('Health insurance', 'Healthcare', 21000),
+    ('Transit pass', 'Transportation', 8900)
+]
+
+# Share of the ledger made up of monthly bills
+MONTHLY_SHARE = 0.08
+
+
+def ledger_rows(rows, category_ids, seed=42, years=3, today=None):
+    """Yield one-time expense rows for the expense table; category_ids maps category name -> id"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    days = years * 365
+    start = today - timedelta(days=days)
+    names = [name for name in CATEGORY_PROFILES if name in category_ids]
+    weights = [CATEGORY_PROFILES[name][0] for name in names]
+
+    for i in range(rows):
+        category = rng.choices(names, weights)[0]
+        _, median, merchants = CATEGORY_PROFILES[category]
+        # sqrt of a uniform skews towards recent days: activity grows over time
+        expense_date = start + timedelta(days=int(days * math.sqrt(rng.random())))
+        if expense_date.weekday() < 5 and rng.random() < 0.3:
+            expense_date += timedelta(days=5 - expense_date.weekday() + rng.randint(0, 1))
+        yield {
+            'amount_cents': round(min(median * rng.lognormvariate(0, 0.8), 99999) * 100),
+            'description': f'{rng.choice(merchants)} #{i}',
+            'date': min(expense_date, today),
+            'category_id': category_ids[category],
+            'is_monthly': False,
+            'is_recurring_template': False,
+            'recurring_through': None
+        }
+
+
+def bill_templates(series, category_ids, seed=42, years=3, today=None):
+    """Yield the first expense of each monthly bill series, dated in the ledger's first month"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    first_month = today - timedelta(days=years * 365)
+    bills = [bill for bill in MONTHLY_BILLS if bill[1] in category_ids]
+    for i in range(series if bills else 0):
+        description, category, amount_cents = bills[i % len(bills)]
+        if i >= len(bills):
+            description = f'{description} {i // len(bills) + 1}'
+        first_date = first_month.replace(day=rng.randint(1, 28))
+        yield {
+            'amount_cents': amount_cents,
+            'description': description,
+            'date': first_date,
+            'category_id': category_ids[category],
+            'is_monthly': True,
+            'is_recurring_template': True,
+            'recurring_through': first_date
+        }
+
+
+def seed_ledger(expense_app, rows, seed=42, years=3):
+    """Insert a synthetic ledger through the app's models and rebuild the rollups.
+
+    About MONTHLY_SHARE of the rows are monthly bills: their first expense is inserted and
+    the app's own materialize_recurring() fills in the following months. Must run inside an
+    app context, after init_db(); inside tenant_context() the ledger goes to that tenant
+    (otherwise to the default one). Returns the seconds it took.
+    """
+    started = time.perf_counter()
+    db = expense_app.db
+    category_ids = dict(db.session.query(expense_app.Category.name, expense_app.Category.id).all())
+    insert = expense_app.Expense.__table__.insert()
+    series = round(rows * MONTHLY_SHARE / (years * 12))
+    batch = list(bill_templates(series, category_ids, seed=seed, years=years))
+    for row in ledger_rows(rows - series * years * 12, category_ids, seed=seed, years=years):
+        batch.append(row)
+        if len(batch) == INSERT_BATCH_SIZE:
+            db.session.execute(insert, batch)
+            batch = []
+    if batch:
+        db.session.execute(insert, batch)
+    db.session.commit()
+    expense_app.materialize_recurring()
+    expense_app.rebuild_rollups()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed the configured database with a synthetic ledger')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--years', type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    import app as expense_app
+
+    flask_app = expense_app.create_app()
+    with flask_app.app_context():
+        expense_app.init_db()
+        seconds = seed_ledger(expense_app, args.rows, seed=args.seed, years=args.years)
+    print(f'Inserted {args.rows} expenses in {seconds:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
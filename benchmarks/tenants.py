@@ -0,0 +1,162 @@
+"""Per-tenant latency as the number of tenants grows.
+
+Every tenant gets the same synthetic ledger (--rows-per-tenant), so the database grows
+with the tenant count while each tenant's own data stays the same size. Reader threads
+poll one tenant's expense list, dashboard and budgets; writer threads add expenses. Half
+of all requests go to one hot tenant, the rest spread evenly over the others. Each
+(mode, tenant count) runs in its own subprocess: mode 'shared' keeps every tenant in one
+database, 'files' gives each its own SQLite file (TENANT_DATABASE_DIR).
+
+    python benchmarks/tenants.py
+    python benchmarks/tenants.py --tenants 1 --tenants 10 --tenants 100 --mode files --seconds 10
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TENANT_COUNTS = [1, 10, 100]
+MODES = ('shared', 'files')
+
+# Share of requests sent to the first (hot) tenant
+HOT_SHARE = 0.5
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def latency_summary(samples):
+    if not samples:
+        return {'requests': 0}
+    return {
+        'requests': len(samples),
+        'p50_ms': round(statistics.median(samples) * 1000, 2),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 2)
+    }
+
+
+def run_single(mode, tenant_count, rows_per_tenant, readers, writers, seconds):
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['CACHE_BACKEND'] = 'none'
+    os.environ['MULTI_TENANT'] = '1'
+    if mode == 'files':
+        os.environ['TENANT_DATABASE_DIR'] = os.path.join(workdir, 'tenants')
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as expense_app
+    from synthetic import seed_ledger
+
+    flask_app = expense_app.create_app()
+    slugs = [f'tenant{i:03d}' for i in range(tenant_count)]
+    category_ids = {}
+    started = time.perf_counter()
+    with flask_app.app_context():
+        expense_app.init_db()
+        for i, slug in enumerate(slugs):
+            tenant = expense_app.create_tenant(slug)
+            with expense_app.tenant_context(tenant):
+                seed_ledger(expense_app, rows_per_tenant, seed=i)
+                category_ids[slug] = [category.id for category in expense_app.Category.query]
+    seed_seconds = time.perf_counter() - started
+
+    def pick_tenant(rng):
+        if len(slugs) == 1 or rng.random() < HOT_SHARE:
+            return slugs[0]
+        return rng.choice(slugs[1:])
+
+    stop = threading.Event()
+    latencies = {'hot_read': [], 'other_read': [], 'write': []}
+    errors = []
+    urls = ['/api/expenses?limit=50', '/api/expenses?limit=50&date_from=2024-01-01&date_to=2024-03-31',
+            '/', '/api/budgets']
+
+    def reader():
+        client = flask_app.test_client()
+        rng = random.Random()
+        while not stop.is_set():
+            slug = pick_tenant(rng)
+            started = time.perf_counter()
+            response = client.get(rng.choice(urls), headers={'X-Tenant': slug})
+            response.get_data()
+            latencies['hot_read' if slug == slugs[0] else 'other_read'].append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    def writer():
+        client = flask_app.test_client()
+        rng = random.Random()
+        while not stop.is_set():
+            slug = pick_tenant(rng)
+            started = time.perf_counter()
+            response = client.post('/add_expense', headers={'X-Tenant': slug}, data={
+                'amount': f'{rng.uniform(1, 100):.2f}',
+                'description': 'Benchmark write',
+                'date': date.today().isoformat(),
+                'category_id': str(rng.choice(category_ids[slug]))
+            })
+            latencies['write'].append(time.perf_counter() - started)
+            if response.status_code != 302:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    result = {
+        'mode': mode,
+        'tenants': tenant_count,
+        'total_rows': tenant_count * rows_per_tenant,
+        'seed_seconds': round(seed_seconds, 1),
+        'errors': len(errors)
+    }
+    for kind, samples in latencies.items():
+        result[kind] = latency_summary(samples)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, action='append', help='tenant count (repeatable)')
+    parser.add_argument('--mode', choices=MODES, action='append', help='shared or files (repeatable)')
+    parser.add_argument('--rows-per-tenant', type=int, default=2000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.mode[0], args.tenants[0], args.rows_per_tenant,
+                                    args.readers, args.writers, args.seconds)))
+        return
+
+    for mode in args.mode or MODES:
+        for tenant_count in args.tenants or DEFAULT_TENANT_COUNTS:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--single', '--mode', mode,
+                 '--tenants', str(tenant_count), '--rows-per-tenant', str(args.rows_per_tenant),
+                 '--readers', str(args.readers), '--writers', str(args.writers),
+                 '--seconds', str(args.seconds)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Application settings, read from the environment (see Configuration in the README)."""
+import os
+
+
+def database_url():
+    url = os.environ.get('DATABASE_URL', 'sqlite:///expenses.db')
+    # Heroku-style postgres:// URLs are not accepted by SQLAlchemy 2
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here')
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool (per process) and SQLite tuning
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    SQLITE_TUNE = os.environ.get('SQLITE_TUNE', '1') != '0'
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 15))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+    # Expense list: rows per page, and the ledger size up to which numbered pages are shown
+    # (larger ledgers are browsed with newer/older cursors)
+    EXPENSES_PAGE_SIZE = int(os.environ.get('EXPENSES_PAGE_SIZE', 10))
+    EXPENSES_PAGE_NUMBERS_MAX_ROWS = int(os.environ.get('EXPENSES_PAGE_NUMBERS_MAX_ROWS', 1000))
+
+    # Budgets are flagged as 'warning' once this share of the monthly limit is spent
+    BUDGET_WARNING_RATIO = float(os.environ.get('BUDGET_WARNING_RATIO', 0.8))
+
+    # Tenants: with MULTI_TENANT each request names its tenant (slug) in TENANT_HEADER, set
+    # by the authenticating proxy in front of the app; otherwise everything belongs to the
+    # 'default' tenant. TENANT_DATABASE_DIR gives every tenant its own SQLite file there.
+    MULTI_TENANT = os.environ.get('MULTI_TENANT', '0') == '1'
+    TENANT_HEADER = os.environ.get('TENANT_HEADER', 'X-Tenant')
+    TENANT_DATABASE_DIR = os.environ.get('TENANT_DATABASE_DIR')
+
+    # Response cache: 'memory' (per process), 'sqlite' (shared file) or 'none'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 300))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 256))
+    CACHE_PATH = os.environ.get('CACHE_PATH', 'cache.db')
+
+    # Background PDF rendering: worker threads, queue bound and where finished reports are kept
+    # (PDF_JOB_DIR defaults to <instance path>/pdf_jobs)
+    PDF_JOB_WORKERS = int(os.environ.get('PDF_JOB_WORKERS', 2))
+    PDF_JOB_MAX_PENDING = int(os.environ.get('PDF_JOB_MAX_PENDING', 16))
+    PDF_JOB_DIR = os.environ.get('PDF_JOB_DIR')
+
+    # Opt-in request instrumentation: Server-Timing headers and /metrics. A sampled fraction
+    # of requests runs under cProfile; profiles of requests slower than PROFILE_SLOW_MS are
+    # written to PROFILE_DIR (defaults to <instance path>/profiles)
+    INSTRUMENTATION = os.environ.get('INSTRUMENTATION', '0') == '1'
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_SLOW_MS = int(os.environ.get('PROFILE_SLOW_MS', 500))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
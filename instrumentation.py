@@ -0,0 +1,219 @@
+"""Opt-in request instrumentation.
+
+Every request gets a timing record (wall time, SQL statement count and time, template
+render time and any named stages such as PDF builds). The record is returned to the
+client as a Server-Timing header and folded into per-process aggregates that /metrics
+serves in the Prometheus text format. A sampled fraction of requests can also run under
+cProfile; the profile is written to disk only when the request turns out to be slow.
+
+Streamed responses are measured up to the point the body starts streaming.
+"""
+import cProfile
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import Response, before_render_template, g, request, template_rendered
+from sqlalchemy import event
+
+# Histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Timing record of the request being handled on this thread (None outside requests)
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    """Times collected while handling one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.stages = {}
+
+    def add_stage(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        entries = [f'sql;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"']
+        entries += [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in self.stages.items()]
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+class Histogram:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def format_labels(labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels)
+
+
+class Instrumentation:
+    """Per-process request metrics, attached to an app with init_app()"""
+
+    def __init__(self, prefix='expense_tracker', profile_sample_rate=0.0, profile_slow_ms=500,
+                 profile_dir=None):
+        self.prefix = prefix
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_slow_ms = profile_slow_ms
+        self.profile_dir = profile_dir
+        self._requests = {}
+        self._request_durations = {}
+        self._sql_count = {}
+        self._sql_time = {}
+        self._stage_durations = {}
+        self._lock = threading.Lock()
+        # cProfile can only profile one request at a time
+        self._profile_lock = threading.Lock()
+
+    def init_app(self, app, engine):
+        app.extensions['instrumentation'] = self
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        self.watch_engine(engine)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def watch_engine(self, engine):
+        """Count and time the queries run on engine (init_app watches the main one)"""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    @contextmanager
+    def timed(self, stage):
+        """Time the enclosed block as stage, both for the current request and in /metrics"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            timings = current_timings.get()
+            if timings is not None:
+                timings.add_stage(stage, seconds)
+            with self._lock:
+                self._stage_durations.setdefault(stage, Histogram()).observe(seconds)
+
+    def _start_request(self):
+        g.instrumentation_token = current_timings.set(RequestTimings())
+        if self.profile_sample_rate and random.random() < self.profile_sample_rate:
+            if self._profile_lock.acquire(blocking=False):
+                g.profiler = cProfile.Profile()
+                g.profiler.enable()
+
+    def _finish_request(self, response):
+        timings = current_timings.get()
+        if timings is None:
+            return response
+        total = timings.elapsed()
+        response.headers['Server-Timing'] = timings.server_timing(total)
+
+        endpoint = request.endpoint or 'unmatched'
+        key = (endpoint, request.method, str(response.status_code))
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._request_durations.setdefault(endpoint, Histogram()).observe(total)
+            self._sql_count[endpoint] = self._sql_count.get(endpoint, 0) + timings.sql_count
+            self._sql_time[endpoint] = self._sql_time.get(endpoint, 0.0) + timings.sql_time
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self._profile_lock.release()
+            if total * 1000 >= self.profile_slow_ms:
+                self._dump_profile(profiler, endpoint, total)
+        return response
+
+    def _teardown_request(self, exc):
+        # Requests that fail before after_request still have to give up the profiler
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self._profile_lock.release()
+        token = g.pop('instrumentation_token', None)
+        if token is not None:
+            current_timings.reset(token)
+
+    def _dump_profile(self, profiler, endpoint, total):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        filename = f'{time.strftime("%Y%m%d_%H%M%S")}-{endpoint}-{total * 1000:.0f}ms-{uuid.uuid4().hex[:8]}.prof'
+        profiler.dump_stats(os.path.join(self.profile_dir, filename))
+
+    def _template_started(self, sender, template, context, **extra):
+        g.template_started = time.perf_counter()
+
+    def _template_finished(self, sender, template, context, **extra):
+        started = g.pop('template_started', None)
+        timings = current_timings.get()
+        if started is not None and timings is not None:
+            timings.add_stage('template', time.perf_counter() - started)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        timings = current_timings.get()
+        if timings is not None:
+            timings.sql_count += 1
+            timings.sql_time += time.perf_counter() - started
+
+    def metrics_view(self):
+        return Response(self.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    def render_metrics(self):
+        """All aggregates in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            self._counter(lines, 'http_requests_total', 'Requests handled',
+                          {(('endpoint', e), ('method', m), ('status', s)): n
+                           for (e, m, s), n in self._requests.items()})
+            self._histograms(lines, 'http_request_duration_seconds', 'Request wall time, excluding streamed bodies',
+                             {(('endpoint', e),): h for e, h in self._request_durations.items()})
+            self._counter(lines, 'sql_statements_total', 'SQL statements executed while handling requests',
+                          {(('endpoint', e),): n for e, n in self._sql_count.items()})
+            self._counter(lines, 'sql_duration_seconds_total', 'Time spent in SQL statements while handling requests',
+                          {(('endpoint', e),): n for e, n in self._sql_time.items()})
+            self._histograms(lines, 'stage_duration_seconds', 'Time spent in named stages (templates, PDF builds)',
+                             {(('stage', s),): h for s, h in self._stage_durations.items()})
+        return '\n'.join(lines) + '\n'
+
+    def _counter(self, lines, name, help_text, samples):
+        name = f'{self.prefix}_{name}'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for labels, value in sorted(samples.items()):
+            lines.append(f'{name}{{{format_labels(labels)}}} {value}')
+
+    def _histograms(self, lines, name, help_text, histograms):
+        name = f'{self.prefix}_{name}'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, histogram in sorted(histograms.items()):
+            label_text = format_labels(labels)
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{label_text}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
@@ -0,0 +1,45 @@
+"""Money amounts as integer cents.
+
+Amounts are stored, summed and compared as integers (minor units), so totals are exact
+however many rows they cover. Conversion happens only at the edges: parsing form, CSV or
+JSON input with to_cents, and formatting output with format_cents (text) or
+cents_to_float (JSON numbers).
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+
+# Largest accepted amount: keeps any realistic ledger total well inside a 64-bit integer
+# and exactly representable as a float for the columnar exports
+MAX_CENTS = 10 ** 12
+
+
+def to_cents(value):
+    """Integer cents for a decimal string or number ('12.5' -> 1250), rounded half up.
+
+    Raises ValueError for anything that is not a finite number.
+    """
+    try:
+        amount = Decimal(str(value).strip())
+        if not amount.is_finite():
+            raise ValueError(f'Invalid amount: {value!r}')
+        return int(amount.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+    except InvalidOperation as e:
+        raise ValueError(f'Invalid amount: {value!r}') from e
+
+
+def from_cents(cents):
+    """Exact Decimal for integer cents (1250 -> Decimal('12.50'))"""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def format_cents(cents):
+    """Two-decimal text for integer cents (1250 -> '12.50'), without a float round trip"""
+    cents = int(cents)
+    whole, fraction = divmod(abs(cents), 100)
+    return f"{'-' if cents < 0 else ''}{whole}.{fraction:02d}"
+
+
+def cents_to_float(cents):
+    """Float for JSON output; the nearest double to the exact amount, so it prints as e.g. 12.5"""
+    return cents / 100
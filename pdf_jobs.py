@@ -0,0 +1,125 @@
+"""Background PDF rendering.
+
+Jobs run on a bounded thread pool so report generation never holds a request worker.
+Each job's state lives on disk next to its output (<job_id>.json and <job_id>.pdf), so
+any process on the host can report status or serve the file, not just the one that
+rendered it. The state records the pid of the process running the job, so a job whose
+worker died mid-render (restart, OOM kill) is reported as failed instead of running forever.
+Jobs can be given an owner (the tenant that asked for them); lookups naming another owner
+find nothing.
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class QueueFullError(Exception):
+    """Raised when max_pending jobs are already queued or running"""
+
+
+def process_alive(pid):
+    """Whether a process with this pid exists on the host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, owned by another user
+        return True
+    return True
+
+
+class PdfJobQueue:
+    def __init__(self, directory, max_workers=2, max_pending=16, retention=3600):
+        self.directory = directory
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pdf-job')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, render, owner=None):
+        """Queue render(progress) on behalf of owner and return the new job id.
+
+        render must return the PDF bytes; it may call progress(percent, message) as it goes.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f'{self._pending} PDF jobs already pending')
+            self._pending += 1
+        os.makedirs(self.directory, exist_ok=True)
+        self._purge_expired()
+        job_id = uuid.uuid4().hex
+        self._write_state(job_id, owner, status='queued', progress=0)
+        self._executor.submit(self._run, job_id, owner, render)
+        return job_id
+
+    def status(self, job_id, owner=None):
+        """Job state dict, or None for an unknown (or expired) job or, when owner is given, another owner's"""
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id, 'json')) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        if owner is not None and state.get('owner') != owner:
+            return None
+        pid = state.get('pid')
+        if state['status'] in ('queued', 'running') and pid is not None and not process_alive(pid):
+            state.update(status='failed', error='The process rendering this job exited before it finished')
+        return state
+
+    def pdf_path(self, job_id, owner=None):
+        """Path of a finished job's PDF, or None if it is not ready (or, when owner is given, not theirs)"""
+        state = self.status(job_id, owner)
+        if state is None or state['status'] != 'done':
+            return None
+        return self._path(job_id, 'pdf')
+
+    def _run(self, job_id, owner, render):
+        def progress(percent, message=None):
+            self._write_state(job_id, owner, status='running', progress=percent, message=message)
+
+        try:
+            progress(0, 'Starting')
+            pdf_content = render(progress)
+            tmp_path = self._path(job_id, 'pdf.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(pdf_content)
+            os.replace(tmp_path, self._path(job_id, 'pdf'))
+            self._write_state(job_id, owner, status='done', progress=100, size=len(pdf_content))
+        except Exception as e:
+            self._write_state(job_id, owner, status='failed', progress=100, error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _write_state(self, job_id, owner, **state):
+        state['job_id'] = job_id
+        state['owner'] = owner
+        state['pid'] = os.getpid()
+        state['updated_at'] = time.time()
+        tmp_path = self._path(job_id, 'json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._path(job_id, 'json'))
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.retention
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _path(self, job_id, extension):
+        return os.path.join(self.directory, f'{job_id}.{extension}')
@@ -0,0 +1,336 @@
+"""PDF rendering for the dashboard report and the full ledger.
+
+ReportLab is by far the heaviest import in the application, so app.py only imports this
+module from inside the PDF builders: processes that never render a report never pay for
+it. The renderers take data that has already been queried and return the PDF bytes;
+paragraph and table styles are built once per process and reused.
+"""
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from types import SimpleNamespace
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+
+from money import format_cents
+
+# Fixed ledger table row height, used to size page chunks
+LEDGER_ROW_HEIGHT = 13
+LEDGER_FONT_SIZE = 8
+LEDGER_COL_WIDTHS = [0.9*inch, 3*inch, 1.3*inch, 0.9*inch, 0.8*inch]
+# ReportLab's default left plus right cell padding
+LEDGER_CELL_PADDING = 12
+
+LEDGER_HEADER = ['Date', 'Description', 'Category', 'Amount', 'Type']
+
+
+@lru_cache(maxsize=None)
+def report_styles():
+    """Paragraph and table styles shared by every report rendered in this process"""
+    sheet = getSampleStyleSheet()
+    header_row = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007bff')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]
+    return SimpleNamespace(
+        normal=sheet['Normal'],
+        title=ParagraphStyle(
+            'CustomTitle',
+            parent=sheet['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#007bff'),
+            alignment=TA_CENTER,
+            spaceAfter=20
+        ),
+        subtitle=ParagraphStyle(
+            'CustomSubtitle',
+            parent=sheet['Heading2'],
+            fontSize=16,
+            textColor=colors.HexColor('#007bff'),
+            alignment=TA_LEFT,
+            spaceAfter=12
+        ),
+        ledger_title=ParagraphStyle(
+            'LedgerTitle',
+            parent=sheet['Heading1'],
+            fontSize=20,
+            textColor=colors.HexColor('#007bff'),
+            alignment=TA_CENTER,
+            spaceAfter=16
+        ),
+        stats_table=TableStyle(header_row + [
+            ('FONTSIZE', (0, 0), (-1, 0), 12)
+        ]),
+        breakdown_table=TableStyle(header_row + [
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12)
+        ]),
+        expenses_table=TableStyle(header_row + [
+            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+        ]),
+        summary_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#28a745')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]),
+        ledger_table=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#007bff')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), LEDGER_FONT_SIZE),
+            ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -3), [colors.white, colors.HexColor('#f2f2f2')]),
+            ('FONTNAME', (0, -2), (-1, -1), 'Helvetica-Bold'),
+            ('LINEABOVE', (0, -2), (-1, -2), 1, colors.black),
+            ('GRID', (0, 0), (-1, -3), 0.25, colors.grey)
+        ])
+    )
+
+
+def new_document(buffer):
+    return SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
+
+
+def generated_on():
+    return f"Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}"
+
+
+def render_dashboard_pdf(stats, recent_expenses, categories, filter_text=None, progress=None):
+    """Lay out the dashboard report and return its bytes; filter_text is paragraph markup with its values escaped"""
+    progress = progress or (lambda percent, message=None: None)
+    styles = report_styles()
+    total_spent = stats.total_spent_cents
+    month_spent = stats.month_spent_cents
+    total_expenses = stats.total_expenses
+
+    buffer = BytesIO()
+    doc = new_document(buffer)
+    story = []
+
+    # Title
+    story.append(Paragraph("📊 Personal Expense Tracker - Dashboard Report", styles.title))
+    story.append(Paragraph(generated_on(), styles.normal))
+    story.append(Spacer(1, 20))
+
+    # Filter Information
+    if filter_text:
+        story.append(Paragraph(filter_text, styles.normal))
+        story.append(Spacer(1, 15))
+
+    # Dashboard Statistics
+    story.append(Paragraph("Dashboard Statistics", styles.subtitle))
+    stats_data = [
+        ['Metric', 'Value', 'Description'],
+        ['Total Spent', f'${format_cents(total_spent)}', 'Total amount spent'],
+        ['Monthly/Date Range', f'${format_cents(month_spent)}', 'Monthly or filtered total'],
+        ['Total Expenses', str(total_expenses), 'Number of transactions']
+    ]
+    stats_table = Table(stats_data, colWidths=[2*inch, 1.5*inch, 2.5*inch])
+    stats_table.setStyle(styles.stats_table)
+    story.append(stats_table)
+    story.append(Spacer(1, 20))
+
+    # Category breakdown
+    if stats.category_totals:
+        story.append(Paragraph("Spending by Category", styles.subtitle))
+        category_names = {cat.id: cat.name for cat in categories}
+        breakdown_data = [['Category', 'Expenses', 'Amount']]
+        for category_id, (cat_total, cat_count) in sorted(
+                stats.category_totals.items(), key=lambda item: item[1][0], reverse=True):
+            breakdown_data.append([
+                category_names.get(category_id, 'Unknown'),
+                str(cat_count),
+                f'${format_cents(cat_total)}'
+            ])
+        breakdown_table = Table(breakdown_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch])
+        breakdown_table.setStyle(styles.breakdown_table)
+        story.append(breakdown_table)
+        story.append(Spacer(1, 20))
+
+    # Recent Expenses
+    story.append(Paragraph("Recent Expenses", styles.subtitle))
+    if recent_expenses:
+        expenses_data = [LEDGER_HEADER]
+        for expense in recent_expenses:
+            expenses_data.append([
+                expense.date.strftime('%Y-%m-%d'),
+                expense.description,
+                expense.category.name,
+                f'${format_cents(expense.amount_cents)}',
+                'Monthly' if expense.is_monthly else 'One-time'
+            ])
+        expenses_table = Table(expenses_data, colWidths=[1*inch, 2.5*inch, 1*inch, 1*inch, 0.8*inch])
+        expenses_table.setStyle(styles.expenses_table)
+        story.append(expenses_table)
+    else:
+        story.append(Paragraph("No expenses found matching the current filters.", styles.normal))
+    story.append(Spacer(1, 20))
+
+    # Summary
+    story.append(Paragraph("Summary", styles.subtitle))
+    summary_data = [
+        ['Metric', 'Value'],
+        ['Total Transactions', str(total_expenses)],
+        ['Average per Expense', f'${format_cents(round(total_spent / total_expenses))}' if total_expenses > 0 else '$0.00'],
+        ['Available Categories', str(len(categories))]
+    ]
+    summary_table = Table(summary_data, colWidths=[2.5*inch, 1.5*inch])
+    summary_table.setStyle(styles.summary_table)
+    story.append(summary_table)
+
+    # Footer
+    story.append(Spacer(1, 30))
+    story.append(Paragraph("This report was generated by Personal Expense Tracker", styles.normal))
+    story.append(Paragraph("Report includes all data based on applied filters at the time of generation", styles.normal))
+
+    progress(70, 'Rendering')
+    doc.build(story)
+    pdf_content = buffer.getvalue()
+    buffer.close()
+    return pdf_content
+
+
+class LazyStory(list):
+    """ReportLab story that pulls the next flowable from an iterator whenever it runs dry.
+
+    doc.build() consumes its story from the front and checks len() before each step,
+    so the document never holds more than the flowables currently being laid out.
+    """
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+
+    def __len__(self):
+        if not super().__len__():
+            flowable = next(self._source, None)
+            if flowable is not None:
+                self.append(flowable)
+        return super().__len__()
+
+
+def page_chunks(rows, first_size, size):
+    """Group rows into page-sized lists (the first page is shorter) without materializing them all"""
+    chunk = []
+    limit = first_size
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == limit:
+            yield chunk
+            chunk = []
+            limit = size
+    if chunk:
+        yield chunk
+
+
+def fit_text(text, width, font='Helvetica', size=LEDGER_FONT_SIZE):
+    """text cut to its longest prefix that fits width points, with an ellipsis, if it doesn't fit whole"""
+    if stringWidth(text, font, size) <= width:
+        return text
+    # Binary search on the prefix length: descriptions run to 200 characters
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if stringWidth(text[:middle].rstrip() + '\u2026', font, size) <= width:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + '\u2026'
+
+
+def render_ledger_pdf(rows, stats, scope, progress=None):
+    """Lay out ledger rows one page-sized table at a time and return the PDF bytes.
+
+    rows is any iterable of (date, description, name, amount_cents, is_monthly) rows; each page
+    gets a repeated header, a page subtotal and the running total.
+    """
+    progress = progress or (lambda percent, message=None: None)
+    styles = report_styles()
+    buffer = BytesIO()
+    doc = new_document(buffer)
+
+    heading = [
+        Paragraph("Personal Expense Tracker - Expense Ledger", styles.ledger_title),
+        Paragraph(generated_on(), styles.normal),
+        # Paragraphs parse markup; category names are user input
+        Paragraph(f"<b>Scope:</b> {escape(scope)}", styles.normal),
+        Paragraph(
+            f"<b>Transactions:</b> {stats.total_expenses} &nbsp; <b>Total:</b> ${format_cents(stats.total_spent_cents)}",
+            styles.normal
+        ),
+        Spacer(1, 12)
+    ]
+
+    # Size chunks so each table (header + rows + two total rows) fills exactly one page;
+    # the frame loses 12pt to padding and one row is kept spare
+    page_height = doc.height - 12
+    heading_height = sum(
+        flowable.wrap(doc.width, page_height)[1] + flowable.getSpaceAfter() for flowable in heading
+    )
+    rows_per_page = int(page_height // LEDGER_ROW_HEIGHT) - 4
+    first_page_rows = int((page_height - heading_height) // LEDGER_ROW_HEIGHT) - 4
+    # Cells are drawn as single unwrapped lines, so long text is cut to the column
+    description_width = LEDGER_COL_WIDTHS[1] - LEDGER_CELL_PADDING
+    category_width = LEDGER_COL_WIDTHS[2] - LEDGER_CELL_PADDING
+
+    def story():
+        yield from heading
+
+        running_total = 0
+        rows_done = 0
+        first_page = True
+        for page_rows in page_chunks(rows, first_page_rows, rows_per_page):
+            if not first_page:
+                yield PageBreak()
+            first_page = False
+
+            page_total = sum(row.amount_cents for row in page_rows)
+            running_total += page_total
+            data = [LEDGER_HEADER]
+            for row in page_rows:
+                data.append([
+                    row.date.strftime('%Y-%m-%d'),
+                    fit_text(row.description, description_width),
+                    fit_text(row.name, category_width),
+                    f'${format_cents(row.amount_cents)}',
+                    'Monthly' if row.is_monthly else 'One-time'
+                ])
+            data.append(['', 'Page subtotal', '', f'${format_cents(page_total)}', ''])
+            data.append(['', 'Running total', '', f'${format_cents(running_total)}', ''])
+
+            table = Table(data, colWidths=LEDGER_COL_WIDTHS, rowHeights=LEDGER_ROW_HEIGHT, repeatRows=1)
+            table.setStyle(styles.ledger_table)
+            yield table
+
+            rows_done += len(page_rows)
+            if stats.total_expenses:
+                progress(min(95, rows_done * 95 // stats.total_expenses), f'{rows_done} rows rendered')
+
+        if first_page:
+            yield Paragraph("No expenses found matching the current filters.", styles.normal)
+
+    doc.build(LazyStory(story()))
+    pdf_content = buffer.getvalue()
+    buffer.close()
+    return pdf_content
@@ -0,0 +1,73 @@
+"""JSON for the expense API, built from plain row tuples.
+
+The listing endpoints select only the columns a client asked for (?fields=), turn each
+batch of rows into dicts with a formatter per column (isoformat for dates, cents to
+dollars for amounts) and encode the whole batch in one call, instead of building an ORM
+object and a dict with strftime calls per row and encoding rows one at a time.
+
+orjson is used when installed, several times faster than the json module on large lists;
+the JSON is the same either way apart from whitespace.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encoder_name():
+    return 'orjson' if orjson is not None else 'json'
+
+
+def dumps(value):
+    """Compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def parse_fields(value, available):
+    """Field names from a comma-separated ?fields= value, in the order given.
+
+    Every available field (in its default order) when value is empty; raises ValueError
+    for a name that is not available.
+    """
+    fields = []
+    for name in (value or '').split(','):
+        name = name.strip()
+        if not name or name in fields:
+            continue
+        if name not in available:
+            raise ValueError(f"Unknown field: {name} (available: {', '.join(available)})")
+        fields.append(name)
+    return fields or list(available)
+
+
+class RowSerializer:
+    """Turns row tuples into dicts of the selected fields.
+
+    formatters maps a field to the callable applied to its non-null values (fields without
+    one pass through as they are). The first offset columns of each row (e.g. pagination
+    keys) are not part of the output.
+    """
+
+    def __init__(self, fields, formatters, offset=0):
+        self.fields = tuple(fields)
+        self.offset = offset
+        self.converters = [(i, formatters[field]) for i, field in enumerate(self.fields) if formatters.get(field)]
+
+    def dicts(self, rows):
+        fields, offset, converters = self.fields, self.offset, self.converters
+        result = []
+        for row in rows:
+            values = list(row[offset:])
+            for i, formatter in converters:
+                if values[i] is not None:
+                    values[i] = formatter(values[i])
+            result.append(dict(zip(fields, values)))
+        return result
+
+    def encode_items(self, rows):
+        """The rows as JSON array items without the brackets, to splice into a streamed array"""
+        return dumps(self.dicts(rows))[1:-1]
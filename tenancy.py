@@ -0,0 +1,114 @@
+"""Tenants: separate ledgers (households, users) served by one app.
+
+Every ledger table carries a tenant_id (TenantScoped). app.py binds a request, a CLI pass
+or a PDF job to one tenant by putting its id on g; from then on every ORM SELECT, UPDATE
+and DELETE issued through the session is restricted to that tenant (scope_to_tenant), so
+no query can forget the filter. New rows take the bound tenant's id by default. Without a
+bound tenant (maintenance commands) statements cover every tenant.
+
+With TENANT_DATABASE_DIR set, each tenant's ledger lives in its own SQLite file
+(<dir>/<slug>.db), so a busy household's writes never hold the lock another household's
+requests are waiting on. The tenant registry stays in the main database; TenantSession
+sends every other statement to the bound tenant's engine.
+"""
+import os
+import re
+import threading
+
+import sqlalchemy as sa
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.orm import with_loader_criteria
+
+# The tenant of single-tenant deployments, and of rows created before tenants existed
+DEFAULT_TENANT_ID = 1
+DEFAULT_TENANT_SLUG = 'default'
+
+# Slugs double as file names, so keep them to a safe alphabet
+SLUG_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,62}$')
+
+
+def valid_slug(slug):
+    return bool(slug and SLUG_PATTERN.match(slug))
+
+
+def current_tenant_id():
+    """Id of the tenant bound to this app context, or None when unbound"""
+    return g.get('tenant_id') if has_app_context() else None
+
+
+def default_tenant_id():
+    return current_tenant_id() or DEFAULT_TENANT_ID
+
+
+class TenantScoped:
+    """Mixin for models holding one tenant's data; queries are scoped by scope_to_tenant"""
+    # Not a foreign key: with per-tenant files the tenant registry is in another database
+    tenant_id = sa.Column(sa.Integer, nullable=False, default=default_tenant_id)
+
+
+def is_registry(mapper, clause):
+    """Whether a statement targets a table marked info={'registry': True} (kept in the main database)"""
+    if mapper is not None:
+        return sa.inspect(mapper).local_table.info.get('registry', False)
+    return isinstance(clause, sa.Table) and clause.info.get('registry', False)
+
+
+class TenantSession(Session):
+    """Session that uses the bound tenant's own engine, when there is one"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            engine = g.get('tenant_engine')
+            if engine is not None and not is_registry(mapper, clause):
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@sa.event.listens_for(TenantSession, 'do_orm_execute')
+def scope_to_tenant(execute_state):
+    """Add tenant_id = <bound tenant> to every TenantScoped entity a statement touches"""
+    tenant_id = current_tenant_id()
+    if tenant_id is None or execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    if execute_state.is_select or execute_state.is_update or execute_state.is_delete:
+        execute_state.statement = execute_state.statement.options(with_loader_criteria(
+            TenantScoped, lambda cls: cls.tenant_id == tenant_id, include_aliases=True))
+
+
+class TenantEngines:
+    """One engine (and connection pool) per tenant database file, created on first use.
+
+    on_create is called with each new engine, to attach connection tuning or instrumentation.
+    """
+
+    def __init__(self, directory, engine_options=None, on_create=None):
+        self.directory = directory
+        self.engine_options = engine_options or {}
+        self.on_create = on_create
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def path(self, slug):
+        if not valid_slug(slug):
+            raise ValueError(f'Invalid tenant slug: {slug!r}')
+        return os.path.join(self.directory, f'{slug}.db')
+
+    def get(self, slug):
+        engine = self._engines.get(slug)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(slug)
+                if engine is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    engine = sa.create_engine('sqlite:///' + self.path(slug), **self.engine_options)
+                    if self.on_create is not None:
+                        self.on_create(engine)
+                    self._engines[slug] = engine
+        return engine
+
+    def dispose(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
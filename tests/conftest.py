@@ -0,0 +1,53 @@
+"""Fixtures: a fresh app on an in-memory SQLite database, initialized like a new install."""
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app as expense_app
+
+
+def make_app(tmp_path, **config):
+    flask_app = expense_app.create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'CACHE_BACKEND': 'none',
+        'PDF_JOB_DIR': str(tmp_path / 'pdf_jobs'),
+        **config
+    })
+    with flask_app.app_context():
+        expense_app.init_db()
+    return flask_app
+
+
+@pytest.fixture
+def app(tmp_path):
+    return make_app(tmp_path)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def seed_expenses(flask_app, count, start=None, categories=0):
+    """Add count expenses spread over the categories, one per day going back from start.
+
+    categories adds that many more categories first, so rows have more distinct categories.
+    """
+    start = start or date.today()
+    with flask_app.app_context():
+        for i in range(categories):
+            expense_app.db.session.add(expense_app.Category(name=f'Category {i}'))
+        expense_app.db.session.commit()
+        category_ids = [category.id for category in expense_app.Category.query.order_by(expense_app.Category.id)]
+        expense_app.insert_expense_batch([{
+            'amount_cents': 100 + i,
+            'description': f'Expense {i}',
+            'date': start - timedelta(days=i),
+            'category_id': category_ids[i % len(category_ids)],
+            'is_monthly': False
+        } for i in range(count)])
@@ -0,0 +1,56 @@
+"""import app stays within a time budget and leaves the PDF and analytics stacks unloaded.
+
+Measured with python -X importtime in fresh interpreters (the fastest of a few runs, to
+ride out noisy machines). IMPORT_BUDGET_MS overrides the budget.
+"""
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+IMPORT_BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', 1000))
+RUNS = 3
+
+# Loaded on first use only: ReportLab when a PDF is rendered, NumPy/pyarrow for analytics and exports
+LAZY_MODULES = ('reportlab', 'numpy', 'pyarrow')
+
+CHECK_LAZY = (
+    "import sys, tempfile, os\n"
+    "import app\n"
+    "flask_app = app.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://',\n"
+    "                            'PDF_JOB_DIR': os.path.join(tempfile.mkdtemp(), 'pdf_jobs')})\n"
+    "with flask_app.app_context():\n"
+    "    app.init_db()\n"
+    "assert flask_app.test_client().get('/').status_code == 200\n"
+    "print('loaded:', [name for name in %r if name in sys.modules])\n" % (LAZY_MODULES,)
+)
+
+
+def import_times(source):
+    """{module: cumulative import microseconds} for running source in a fresh interpreter"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', source],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_time_within_budget():
+    runs = [import_times('import app') for _ in range(RUNS)]
+    fastest = min(runs, key=lambda times: times['app'])
+    import_ms = fastest['app'] / 1000
+    packages = sorted(((us, name) for name, us in fastest.items() if '.' not in name and name != 'app'), reverse=True)
+    assert import_ms <= IMPORT_BUDGET_MS, (
+        f'import app took {import_ms:.0f}ms (budget {IMPORT_BUDGET_MS:.0f}ms); heaviest: '
+        + ', '.join(f'{name} {us / 1000:.0f}ms' for us, name in packages[:5]))
+
+
+def test_pdf_and_analytics_stacks_load_lazily():
+    result = subprocess.run([sys.executable, '-c', CHECK_LAZY], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == 'loaded: []'
@@ -0,0 +1,67 @@
+"""Every dashboard and API filter combination reads expenses through an index (EXPLAIN QUERY PLAN)."""
+import re
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+import app as expense_app
+from conftest import seed_expenses
+
+DATE_RANGE = 'date_toggle=on&date_range_mode=on&date_from=2024-01-01&date_to=2024-03-31'
+
+# URL -> index the expense listing query must use
+FILTERED_URLS = {
+    '/': 'ix_expense_tenant_date_id',
+    '/?category_toggle=on&category=2': 'ix_expense_tenant_category_date',
+    '/?category_toggle=on&categories=2&categories=3': 'ix_expense_tenant_date_id',
+    '/?date_toggle=on&date=2024-02-10': 'ix_expense_tenant_date_id',
+    '/?' + DATE_RANGE: 'ix_expense_tenant_date_id',
+    '/?category_toggle=on&category=2&' + DATE_RANGE: 'ix_expense_tenant_category_date',
+    '/expenses': 'ix_expense_tenant_date_id',
+    '/api/expenses?limit=50': 'ix_expense_tenant_date_id',
+    '/api/expenses?limit=50&category=2': 'ix_expense_tenant_category_date',
+    '/api/expenses?limit=50&date_from=2024-01-01&date_to=2024-03-31': 'ix_expense_tenant_date_id',
+    '/api/expenses?limit=50&category=2&date_from=2024-01-01&date_to=2024-03-31': 'ix_expense_tenant_category_date'
+}
+
+# A plan step reading a whole ledger table rather than seeking an index
+FULL_SCAN = re.compile(r'\bSCAN (expense|expense_rollup|monthly_spend)\b')
+
+
+def query_plans(flask_app, url):
+    """(statement, plan) for every SELECT a GET of url issues, planned with its own parameters"""
+    selects = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            selects.append((statement, parameters))
+
+    with flask_app.app_context():
+        engine = expense_app.db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = flask_app.test_client().get(url)
+        response.get_data()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        return [(statement, ' | '.join(row[-1] for row in cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)))
+                for statement, parameters in selects]
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize('url', FILTERED_URLS)
+def test_filters_use_indexes(app, url):
+    seed_expenses(app, 300, start=date(2024, 6, 30))
+    plans = query_plans(app, url)
+    for statement, plan in plans:
+        assert not FULL_SCAN.search(plan), (statement, plan)
+    expense_plans = [plan for statement, plan in plans if re.search(r'\bFROM expense\b', statement)]
+    assert expense_plans
+    assert all(FILTERED_URLS[url] in plan for plan in expense_plans), expense_plans
@@ -0,0 +1,28 @@
+"""Background PDF jobs are only visible to the tenant that queued them."""
+import time
+
+import app as expense_app
+from conftest import make_app
+
+
+def test_pdf_jobs_are_scoped_to_their_tenant(tmp_path):
+    flask_app = make_app(tmp_path, MULTI_TENANT=True)
+    with flask_app.app_context():
+        expense_app.create_tenant('alice')
+        expense_app.create_tenant('bob')
+    client = flask_app.test_client()
+    alice, bob = {'X-Tenant': 'alice'}, {'X-Tenant': 'bob'}
+
+    response = client.post('/pdf_jobs', headers=alice)
+    assert response.status_code == 202
+    job = response.json
+    for _ in range(100):
+        state = client.get(job['status_url'], headers=alice).json
+        if state['status'] in ('done', 'failed'):
+            break
+        time.sleep(0.05)
+    assert state['status'] == 'done'
+    assert client.get(job['download_url'], headers=alice).status_code == 200
+
+    assert client.get(job['status_url'], headers=bob).status_code == 404
+    assert client.get(job['download_url'], headers=bob).status_code == 404
@@ -0,0 +1,18 @@
+"""Ledger PDF cells are drawn unwrapped, so text is cut to the measured column width."""
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from pdf_reports import LEDGER_CELL_PADDING, LEDGER_COL_WIDTHS, LEDGER_FONT_SIZE, fit_text
+
+DESCRIPTION_WIDTH = LEDGER_COL_WIDTHS[1] - LEDGER_CELL_PADDING
+
+
+def test_long_descriptions_fit_the_column():
+    for description in ('W' * 60, 'Quarterly subscription renewal for the family streaming bundle', 'x' * 200):
+        fitted = fit_text(description, DESCRIPTION_WIDTH)
+        assert stringWidth(fitted, 'Helvetica', LEDGER_FONT_SIZE) <= DESCRIPTION_WIDTH
+        assert fitted.endswith('…')
+        assert description.startswith(fitted[:-1])
+
+
+def test_short_descriptions_are_kept_whole():
+    assert fit_text('Groceries', DESCRIPTION_WIDTH) == 'Groceries'
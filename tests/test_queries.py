@@ -0,0 +1,48 @@
+"""Listing pages issue the same number of SQL statements whatever the ledger size (no N+1)."""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+import app as expense_app
+from conftest import make_app, seed_expenses
+
+LISTING_URLS = ['/', '/expenses', '/api/expenses?limit=50', '/api/expenses?limit=50&fields=id,category']
+
+
+@contextmanager
+def count_statements(flask_app):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with flask_app.app_context():
+        engine = expense_app.db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def statement_count(flask_app, url):
+    client = flask_app.test_client()
+    # The first request looks up the tenant, which later requests take from memory
+    client.get(url).get_data()
+    with count_statements(flask_app) as statements:
+        response = client.get(url)
+        response.get_data()
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('url', LISTING_URLS)
+def test_statement_count_does_not_grow_with_rows(tmp_path, url):
+    counts = []
+    for rows in (20, 200):
+        flask_app = make_app(tmp_path / str(rows))
+        # As many categories as rows, so loading categories per row would show up
+        seed_expenses(flask_app, rows, categories=rows)
+        counts.append(statement_count(flask_app, url))
+    assert counts[0] == counts[1]
@@ -0,0 +1,121 @@
+"""Monthly expenses re-entered by hand, imported or from older databases generate each month once."""
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+import app as expense_app
+
+Expense = expense_app.Expense
+
+
+def add_monthly(client, day, description='Netflix', amount='15.49'):
+    response = client.post('/add_expense', data={
+        'amount': amount, 'description': description, 'date': day.isoformat(), 'category_id': '5',
+        'is_monthly': 'on'})
+    assert response.headers['Location'].endswith('/expenses')
+
+
+def test_reentered_monthly_expense_is_one_series(app, client):
+    for month in range(1, 13):
+        add_monthly(client, date(2025, month, 3))
+    with app.app_context():
+        templates = Expense.query.filter_by(is_recurring_template=True).all()
+        assert [template.date for template in templates] == [date(2025, 1, 3)]
+        assert Expense.query.filter_by(recurring_source_id=templates[0].id).count() == 11
+        assert expense_app.materialize_recurring(as_of=date(2025, 12, 31)) == 0
+        assert expense_app.materialize_recurring(as_of=date(2026, 2, 28)) == 2
+        assert Expense.query.count() == 14
+
+
+def test_months_entered_by_hand_are_skipped(app, client):
+    add_monthly(client, date(2025, 1, 3))
+    # Entered again in March, as a one-time expense with the same details
+    client.post('/add_expense', data={
+        'amount': '15.49', 'description': 'Netflix', 'date': '2025-03-05', 'category_id': '5'})
+    with app.app_context():
+        assert expense_app.materialize_recurring(as_of=date(2025, 4, 30)) == 2
+        dates = [expense.date for expense in Expense.query.order_by(Expense.date)]
+    assert dates == [date(2025, 1, 3), date(2025, 2, 3), date(2025, 3, 5), date(2025, 4, 3)]
+
+
+def test_deleted_occurrence_is_not_generated_again(app, client):
+    add_monthly(client, date(2026, 7, 3))
+    with app.app_context():
+        assert expense_app.materialize_recurring(as_of=date(2026, 9, 30)) == 2
+        skipped = Expense.query.filter_by(date=date(2026, 9, 3)).one()
+    # Deleted to skip September
+    client.post(f'/delete_expense/{skipped.id}')
+    with app.app_context():
+        assert expense_app.materialize_recurring(as_of=date(2026, 9, 30)) == 0
+        assert expense_app.materialize_recurring(as_of=date(2026, 10, 31)) == 1
+        dates = [expense.date for expense in Expense.query.order_by(Expense.date)]
+    assert dates == [date(2026, 7, 3), date(2026, 8, 3), date(2026, 10, 3)]
+
+
+def test_projection_counts_months_not_yet_materialized(app, client):
+    pytest.importorskip('numpy')
+    add_monthly(client, date(2026, 7, 3), amount='10.00')
+    add_monthly(client, date(2026, 9, 10), description='Gym', amount='30.00')
+    with app.app_context():
+        projection = expense_app.recurring_projection(months=3, as_of=date(2026, 9, 15))
+    # Netflix for August (caught up) and September, then monthly; the gym from October
+    assert projection == [(date(2026, 9, 1), 3000, 2000), (date(2026, 10, 1), 0, 4000), (date(2026, 11, 1), 0, 4000)]
+
+
+def test_import_does_not_start_series(app, client):
+    body = 'amount,description,date,category,is_monthly\r\n15.49,Netflix,2025-01-03,Entertainment,true\r\n'
+    response = client.post('/api/expenses/import?format=csv', data=body, content_type='text/csv')
+    assert response.json['imported'] == 1
+    with app.app_context():
+        assert Expense.query.filter_by(is_recurring_template=True).count() == 0
+        assert expense_app.materialize_recurring(as_of=date(2025, 6, 30)) == 0
+
+
+def test_migration_links_reentries_to_one_template(app):
+    with app.app_context():
+        # The schema from before the flag, where every hand-entered monthly expense was a template
+        session = expense_app.db.session
+        session.execute(text('DROP INDEX ix_expense_recurring_template'))
+        session.execute(text('ALTER TABLE expense DROP COLUMN is_recurring_template'))
+        session.execute(text('ALTER TABLE expense DROP COLUMN recurring_through'))
+        session.execute(text('CREATE INDEX ix_expense_monthly ON expense (is_monthly, recurring_source_id)'))
+        for month in range(1, 13):
+            session.execute(text(
+                "INSERT INTO expense (tenant_id, amount_cents, description, date, category_id, is_monthly) "
+                "VALUES (1, 1549, 'Netflix', :day, 5, 1)"), {'day': date(2025, month, 3)})
+        session.commit()
+
+        expense_app.init_db()
+        templates = Expense.query.filter_by(is_recurring_template=True).all()
+        assert len(templates) == 1
+        assert Expense.query.filter_by(recurring_source_id=templates[0].id).count() == 11
+        assert Expense.query.filter(Expense.is_recurring_template.is_(None)).count() == 0
+        assert expense_app.materialize_recurring(as_of=date(2025, 12, 31)) == 0
+        assert expense_app.materialize_recurring(as_of=date(2026, 1, 31)) == 1
+
+
+def test_migration_from_float_amounts_keeps_price_changes_apart(app):
+    with app.app_context():
+        # The schema from before integer cents and the flag: a bill whose price went up in August
+        session = expense_app.db.session
+        session.execute(text('DROP INDEX ix_expense_recurring_template'))
+        session.execute(text('ALTER TABLE expense DROP COLUMN is_recurring_template'))
+        session.execute(text('ALTER TABLE expense DROP COLUMN recurring_through'))
+        session.execute(text('ALTER TABLE expense DROP COLUMN amount_cents'))
+        session.execute(text('ALTER TABLE expense ADD COLUMN amount FLOAT'))
+        for day, amount in ((date(2025, 7, 3), 10.10), (date(2025, 8, 3), 12.99)):
+            session.execute(text(
+                "INSERT INTO expense (tenant_id, amount, description, date, category_id, is_monthly) "
+                "VALUES (1, :amount, 'Netflix', :day, 5, 1)"), {'day': day, 'amount': amount})
+        session.commit()
+
+        expense_app.init_db()
+        templates = Expense.query.filter_by(is_recurring_template=True).order_by(Expense.date).all()
+        assert [(template.date, template.amount_cents) for template in templates] == [
+            (date(2025, 7, 3), 1010), (date(2025, 8, 3), 1299)]
+        assert Expense.query.filter(Expense.recurring_source_id.isnot(None)).count() == 0
+        expense_app.materialize_recurring(as_of=date(2025, 10, 31))
+        generated = Expense.query.filter_by(recurring_source_id=templates[1].id).order_by(Expense.date).all()
+        assert [(expense.date, expense.amount_cents) for expense in generated] == [
+            (date(2025, 9, 3), 1299), (date(2025, 10, 3), 1299)]
@@ -0,0 +1,60 @@
+"""Rollup and monthly spend counters stay equal to the ledger under concurrent writes to the same day and category."""
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+import app as expense_app
+from conftest import make_app
+
+THREADS = 8
+WRITES_PER_THREAD = 20
+
+
+def test_concurrent_adds_and_edits_keep_rollups_exact(tmp_path):
+    # A database file, so every thread has its own connection as in production
+    flask_app = make_app(tmp_path, SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'expenses.db'))
+    day = date.today()
+    with flask_app.app_context():
+        category_id = expense_app.Category.query.order_by(expense_app.Category.id).first().id
+        expense_app.insert_expense_batch([
+            {'amount_cents': 250, 'description': 'Seeded', 'date': day, 'category_id': category_id}
+            for _ in range(THREADS * WRITES_PER_THREAD)
+        ])
+        expense_ids = [expense.id for expense in expense_app.Expense.query.order_by(expense_app.Expense.id)]
+    failures = []
+
+    def post(client, url, expense_date):
+        response = client.post(url, data={'amount': '1.25', 'description': 'Concurrent',
+                                          'date': expense_date.isoformat(), 'category_id': str(category_id)})
+        if not response.headers['Location'].endswith('/expenses'):
+            failures.append(url)
+
+    def writer(thread):
+        client = flask_app.test_client()
+        for i in range(WRITES_PER_THREAD):
+            # Adds land on the shared day while edits move seeded expenses off it
+            post(client, '/add_expense', day)
+            post(client, f'/edit_expense/{expense_ids[thread * WRITES_PER_THREAD + i]}',
+                 day - timedelta(days=1 + thread))
+
+    threads = [threading.Thread(target=writer, args=(thread,)) for thread in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failures
+
+    with flask_app.app_context():
+        Expense, ExpenseRollup = expense_app.Expense, expense_app.ExpenseRollup
+        ledger = expense_app.db.session.query(
+            Expense.date, Expense.category_id, func.sum(Expense.amount_cents), func.count(Expense.id)
+        ).group_by(Expense.date, Expense.category_id).all()
+        rollups = expense_app.db.session.query(
+            ExpenseRollup.day, ExpenseRollup.category_id, ExpenseRollup.total_cents, ExpenseRollup.count
+        ).all()
+        # reconcile_monthly_spend recomputes the counters from the ledger and returns the ones that drifted
+        drifted = expense_app.reconcile_monthly_spend()
+    assert sorted(rollups) == sorted(ledger)
+    assert drifted == []
+    assert (day, category_id, THREADS * WRITES_PER_THREAD * 125, THREADS * WRITES_PER_THREAD) in rollups